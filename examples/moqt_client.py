@@ -9,7 +9,6 @@ from __future__ import annotations
 import argparse
 import threading
 import time
-from collections.abc import Sequence
 
 import msquic
 from moqt import (
@@ -46,8 +45,8 @@ class MoqtClientSession:
         self.control_stream = self.connection.open_stream(msquic.StreamOpenFlags.NONE)
         self.control_stream.start(msquic.StreamStartFlags.IMMEDIATE)
 
-        def on_receive(data: Sequence[int], _fin: bool) -> None:
-            self._on_receive(bytes(data), _fin)
+        def on_receive(data: bytes, _fin: bool) -> None:
+            self._on_receive(data, _fin)
 
         self.control_stream.set_on_receive(on_receive)
 
@@ -63,7 +62,7 @@ class MoqtClientSession:
         """受信バッファからメッセージを処理"""
         while len(self.receive_buffer) > 0:
             try:
-                message, consumed = decode_control_message(bytes(self.receive_buffer))
+                message, consumed = decode_control_message(self.receive_buffer)
                 del self.receive_buffer[:consumed]
                 self._handle_message(message)
             except ValueError:
@@ -10,7 +10,6 @@ import argparse
 import signal
 import threading
 import time
-from collections.abc import Sequence
 
 import msquic
 from moqt import (
@@ -41,8 +40,8 @@ class MoqtServerSession:
         """制御ストリームを設定"""
         self.control_stream = stream
 
-        def on_receive(data: Sequence[int], _fin: bool) -> None:
-            self._on_receive(bytes(data))
+        def on_receive(data: bytes, _fin: bool) -> None:
+            self._on_receive(data)
 
         stream.set_on_receive(on_receive)
 
@@ -61,7 +60,7 @@ class MoqtServerSession:
         """受信バッファからメッセージを処理"""
         while len(self.receive_buffer) > 0:
             try:
-                message, consumed = decode_control_message(bytes(self.receive_buffer))
+                message, consumed = decode_control_message(self.receive_buffer)
                 del self.receive_buffer[:consumed]
                 self._handle_message(message)
             except ValueError:
@@ -10,7 +10,6 @@ import argparse
 import signal
 import threading
 import time
-from collections.abc import Sequence
 
 import numpy as np
 
@@ -214,8 +213,8 @@ class MoqtVideoPublisher:
         self.control_stream = self.connection.open_stream(msquic.StreamOpenFlags.NONE)
         self.control_stream.start(msquic.StreamStartFlags.IMMEDIATE)
 
-        def on_receive(data: Sequence[int], _fin: bool) -> None:
-            self._on_control_receive(bytes(data))
+        def on_receive(data: bytes, _fin: bool) -> None:
+            self._on_control_receive(data)
 
         self.control_stream.set_on_receive(on_receive)
 
@@ -266,7 +265,7 @@ class MoqtVideoPublisher:
         """受信バッファからメッセージを処理"""
         while len(self.receive_buffer) > 0:
             try:
-                message, consumed = decode_control_message(bytes(self.receive_buffer))
+                message, consumed = decode_control_message(self.receive_buffer)
                 del self.receive_buffer[:consumed]
                 self._handle_message(message)
             except ValueError:
@@ -11,7 +11,6 @@ import argparse
 import signal
 import threading
 import time
-from collections.abc import Sequence
 from dataclasses import dataclass, field
 
 import msquic
@@ -76,8 +75,8 @@ class MoqtRelaySession:
         """制御ストリームを設定"""
         self.control_stream = stream
 
-        def on_receive(data: Sequence[int], _fin: bool) -> None:
-            self._on_control_receive(bytes(data))
+        def on_receive(data: bytes, _fin: bool) -> None:
+            self._on_control_receive(data)
 
         stream.set_on_receive(on_receive)
 
@@ -87,8 +86,8 @@ class MoqtRelaySession:
         self.data_streams[stream_id] = stream
         self.data_stream_buffers[stream_id] = bytearray()
 
-        def on_receive(data: Sequence[int], _fin: bool) -> None:
-            self._on_data_receive(stream_id, bytes(data))
+        def on_receive(data: bytes, _fin: bool) -> None:
+            self._on_data_receive(stream_id, data)
 
         stream.set_on_receive(on_receive)
 
@@ -106,7 +105,7 @@ class MoqtRelaySession:
         """制御メッセージを処理"""
         while len(self.receive_buffer) > 0:
             try:
-                message, consumed = decode_control_message(bytes(self.receive_buffer))
+                message, consumed = decode_control_message(self.receive_buffer)
                 del self.receive_buffer[:consumed]
                 self._handle_control_message(message)
             except ValueError:
@@ -207,19 +206,19 @@ class MoqtRelaySession:
         """データストリームヘッダーを解析"""
         try:
             offset = 0
-            stream_type, consumed = decode_varint(bytes(buffer), offset)
+            stream_type, consumed = decode_varint(buffer, offset)
             offset += consumed
 
             if stream_type != StreamType.SUBGROUP:
                 return
 
-            track_alias, consumed = decode_varint(bytes(buffer), offset)
+            track_alias, consumed = decode_varint(buffer, offset)
             offset += consumed
-            group_id, consumed = decode_varint(bytes(buffer), offset)
+            group_id, consumed = decode_varint(buffer, offset)
             offset += consumed
-            subgroup_id, consumed = decode_varint(bytes(buffer), offset)
+            subgroup_id, consumed = decode_varint(buffer, offset)
             offset += consumed
-            publisher_priority, consumed = decode_varint(bytes(buffer), offset)
+            publisher_priority, consumed = decode_varint(buffer, offset)
             offset += consumed
 
             self.data_stream_headers[stream_id] = {
@@ -252,20 +251,20 @@ class MoqtRelaySession:
         while len(buffer) > 0:
             try:
                 offset = 0
-                object_id, consumed = decode_varint(bytes(buffer), offset)
+                object_id, consumed = decode_varint(buffer, offset)
                 offset += consumed
-                extensions_count, consumed = decode_varint(bytes(buffer), offset)
+                extensions_count, consumed = decode_varint(buffer, offset)
                 offset += consumed
 
                 # Extensions をスキップ
                 for _ in range(extensions_count):
-                    _, consumed = decode_varint(bytes(buffer), offset)
+                    _, consumed = decode_varint(buffer, offset)
                     offset += consumed
-                    ext_len, consumed = decode_varint(bytes(buffer), offset)
+                    ext_len, consumed = decode_varint(buffer, offset)
                     offset += consumed
                     offset += ext_len
 
-                payload_len, consumed = decode_varint(bytes(buffer), offset)
+                payload_len, consumed = decode_varint(buffer, offset)
                 offset += consumed
 
                 if len(buffer) < offset + payload_len:
@@ -10,7 +10,6 @@ import argparse
 import signal
 import threading
 import time
-from collections.abc import Sequence
 from dataclasses import dataclass
 
 import msquic
@@ -214,8 +213,8 @@ class MoqtVideoSubscriber:
         self.control_stream = self.connection.open_stream(msquic.StreamOpenFlags.NONE)
         self.control_stream.start(msquic.StreamStartFlags.IMMEDIATE)
 
-        def on_receive(data: Sequence[int], _fin: bool) -> None:
-            self._on_control_receive(bytes(data))
+        def on_receive(data: bytes, _fin: bool) -> None:
+            self._on_control_receive(data)
 
         self.control_stream.set_on_receive(on_receive)
 
@@ -266,7 +265,7 @@ class MoqtVideoSubscriber:
         """制御メッセージを処理"""
         while len(self.receive_buffer) > 0:
             try:
-                message, consumed = decode_control_message(bytes(self.receive_buffer))
+                message, consumed = decode_control_message(self.receive_buffer)
                 del self.receive_buffer[:consumed]
                 self._handle_control_message(message)
             except ValueError:
@@ -296,8 +295,8 @@ class MoqtVideoSubscriber:
         stream_id = id(stream)
         self.data_stream_buffers[stream_id] = bytearray()
 
-        def on_receive(data: Sequence[int], _fin: bool) -> None:
-            self._on_data_receive(stream_id, bytes(data))
+        def on_receive(data: bytes, _fin: bool) -> None:
+            self._on_data_receive(stream_id, data)
 
         stream.set_on_receive(on_receive)
 
@@ -320,19 +319,19 @@ class MoqtVideoSubscriber:
         """データストリームヘッダーを解析"""
         try:
             offset = 0
-            stream_type, consumed = decode_varint(bytes(buffer), offset)
+            stream_type, consumed = decode_varint(buffer, offset)
             offset += consumed
 
             if stream_type != StreamType.SUBGROUP:
                 return
 
-            track_alias, consumed = decode_varint(bytes(buffer), offset)
+            track_alias, consumed = decode_varint(buffer, offset)
             offset += consumed
-            group_id, consumed = decode_varint(bytes(buffer), offset)
+            group_id, consumed = decode_varint(buffer, offset)
             offset += consumed
-            subgroup_id, consumed = decode_varint(bytes(buffer), offset)
+            subgroup_id, consumed = decode_varint(buffer, offset)
             offset += consumed
-            publisher_priority, consumed = decode_varint(bytes(buffer), offset)
+            publisher_priority, consumed = decode_varint(buffer, offset)
             offset += consumed
 
             self.data_stream_headers[stream_id] = {
@@ -364,20 +363,20 @@ class MoqtVideoSubscriber:
         while len(buffer) > 0:
             try:
                 offset = 0
-                object_id, consumed = decode_varint(bytes(buffer), offset)
+                object_id, consumed = decode_varint(buffer, offset)
                 offset += consumed
-                extensions_count, consumed = decode_varint(bytes(buffer), offset)
+                extensions_count, consumed = decode_varint(buffer, offset)
                 offset += consumed
 
                 # Extensions をスキップ
                 for _ in range(extensions_count):
-                    _, consumed = decode_varint(bytes(buffer), offset)
+                    _, consumed = decode_varint(buffer, offset)
                     offset += consumed
-                    ext_len, consumed = decode_varint(bytes(buffer), offset)
+                    ext_len, consumed = decode_varint(buffer, offset)
                     offset += consumed
                     offset += ext_len
 
-                payload_len, consumed = decode_varint(bytes(buffer), offset)
+                payload_len, consumed = decode_varint(buffer, offset)
                 offset += consumed
 
                 if len(buffer) < offset + payload_len:
@@ -47,7 +47,10 @@
 
 #include <quic_var_int.h>
 
+#include <algorithm>
 #include <atomic>
+#include <chrono>
+#include <condition_variable>
 #include <cstring>
 #include <functional>
 #include <memory>
@@ -89,6 +92,27 @@ void close_api() {
 class Stream;
 class Connection;
 
+// ========== Buffer ==========
+// バッファプロトコルで取得したビューをスコープ終了時に解放する
+class BufferView {
+ public:
+  explicit BufferView(nb::handle obj) {
+    if (PyObject_GetBuffer(obj.ptr(), &view_, PyBUF_SIMPLE) != 0) {
+      throw nb::python_error();
+    }
+  }
+  ~BufferView() { PyBuffer_Release(&view_); }
+
+  BufferView(const BufferView&) = delete;
+  BufferView& operator=(const BufferView&) = delete;
+
+  const uint8_t* data() const { return static_cast<const uint8_t*>(view_.buf); }
+  size_t size() const { return static_cast<size_t>(view_.len); }
+
+ private:
+  Py_buffer view_;
+};
+
 // ========== Registration ==========
 class Registration {
  public:
@@ -245,7 +269,7 @@ class Configuration {
 struct StreamContext {
   std::atomic<bool> is_closing{false};
   HQUIC handle = nullptr;
-  std::function<void(const std::vector<uint8_t>&, bool)> on_receive;
+  std::function<void(nb::bytes, bool)> on_receive;
   std::function<void()> on_send_complete;
   std::function<void(uint64_t)> on_peer_send_aborted;
   std::function<void(uint64_t)> on_peer_receive_aborted;
@@ -306,7 +330,7 @@ class Stream {
     }
   }
 
-  void set_on_receive(std::function<void(const std::vector<uint8_t>&, bool)> callback) {
+  void set_on_receive(std::function<void(nb::bytes, bool)> callback) {
     // GIL 保持中に呼ばれる (Python から)
     context_->on_receive = std::move(callback);
   }
@@ -335,18 +359,25 @@ QUIC_STATUS QUIC_API StreamCallback(HQUIC stream, void* context, QUIC_STREAM_EVE
 
   switch (event->Type) {
     case QUIC_STREAM_EVENT_RECEIVE: {
-      // データを先にコピー (GIL 不要)
-      std::vector<uint8_t> data;
-      for (uint32_t i = 0; i < event->RECEIVE.BufferCount; i++) {
-        const auto& buf = event->RECEIVE.Buffers[i];
-        data.insert(data.end(), buf.Buffer, buf.Buffer + buf.Length);
-      }
       bool fin = (event->RECEIVE.Flags & QUIC_RECEIVE_FLAG_FIN) != 0;
 
       // GIL を取得してコールバックにアクセス
       nb::gil_scoped_acquire acquire;
       if (ctx->on_receive) {
-        ctx->on_receive(data, fin);
+        // 受信データはイベント中だけ有効なので、std::vector を経由せず 1 回のコピーで bytes を作って渡す
+        size_t total_length = 0;
+        for (uint32_t i = 0; i < event->RECEIVE.BufferCount; i++) {
+          total_length += event->RECEIVE.Buffers[i].Length;
+        }
+        // 中身を初期化していない bytes を確保し、Python に渡す前に受信データを書き込む
+        nb::bytes data(nullptr, total_length);
+        char* dest = PyBytes_AS_STRING(data.ptr());
+        for (uint32_t i = 0; i < event->RECEIVE.BufferCount; i++) {
+          const auto& buf = event->RECEIVE.Buffers[i];
+          std::memcpy(dest, buf.Buffer, buf.Length);
+          dest += buf.Length;
+        }
+        ctx->on_receive(std::move(data), fin);
       }
       break;
     }
@@ -413,7 +444,12 @@ QUIC_STATUS QUIC_API StreamCallback(HQUIC stream, void* context, QUIC_STREAM_EVE
 }
 
 // ========== Connection ==========
-// 注意: mutex は使用しない。すべてのコールバック操作は GIL で保護される。
+// コールバックと streams は GIL で保護する。
+// Python から呼ばれる set_on_* は GIL 保持中、
+// MsQuic からのコールバックは GIL を取得してからアクセスする。
+// started / shutdown_completed / exit_in_progress は with 文の終了時に GIL を解放して
+// 待機するため、GIL とは独立した shutdown_mutex で保護する。
+// shutdown_mutex を保持したまま MsQuic API を呼び出したり GIL を取得したりしない。
 struct ConnectionContext {
   std::atomic<bool> is_closing{false};
   HQUIC handle = nullptr;
@@ -423,13 +459,46 @@ struct ConnectionContext {
   std::vector<std::shared_ptr<Stream>> streams;
   // DATAGRAM コールバック
   std::function<void(bool, uint16_t)> on_datagram_state_changed;
-  std::function<void(const std::vector<uint8_t>&)> on_datagram_received;
+  std::function<void(nb::bytes)> on_datagram_received;
   std::function<void(QUIC_DATAGRAM_SEND_STATE)> on_datagram_send_state_changed;
   // Resumption コールバック
-  std::function<void(const std::vector<uint8_t>&)> on_resumption_ticket_received;
-  std::function<void(const std::vector<uint8_t>&)> on_resumed;
+  std::function<void(nb::bytes)> on_resumption_ticket_received;
+  std::function<void(nb::bytes)> on_resumed;
+  // with 文の終了時に SHUTDOWN_COMPLETE を待機するための状態
+  std::mutex shutdown_mutex;
+  std::condition_variable shutdown_cv;
+  bool started = false;
+  bool shutdown_completed = false;
+  // with 文の終了処理が ConnectionShutdown を呼ぶと決めた後は true になる
+  // true の場合、SHUTDOWN_COMPLETE のコールバックは ConnectionClose を呼ばず、
+  // 待機していたスレッドがハンドルを Close する
+  bool exit_in_progress = false;
+};
+
+// 現在のスレッドで処理中の Connection コールバックのコンテキスト
+// 自身のコールバックの中から with 文を抜けようとした場合を検出するために使う
+thread_local ConnectionContext* t_callback_connection_context = nullptr;
+
+// Connection コールバックの処理中だけ t_callback_connection_context を設定する
+class CallbackConnectionContextScope {
+ public:
+  explicit CallbackConnectionContextScope(ConnectionContext* context)
+      : previous_(t_callback_connection_context) {
+    t_callback_connection_context = context;
+  }
+  ~CallbackConnectionContextScope() { t_callback_connection_context = previous_; }
+
+  CallbackConnectionContextScope(const CallbackConnectionContextScope&) = delete;
+  CallbackConnectionContextScope& operator=(const CallbackConnectionContextScope&) = delete;
+
+ private:
+  ConnectionContext* previous_;
 };
 
+// with 文の終了時に SHUTDOWN_COMPLETE を待機する上限
+// MsQuic の既定の DisconnectTimeout (16 秒) より長くする
+constexpr std::chrono::seconds SHUTDOWN_WAIT_TIMEOUT{30};
+
 // Connection コールバック（前方宣言）
 QUIC_STATUS QUIC_API ConnectionCallback(HQUIC connection, void* context, QUIC_CONNECTION_EVENT* event);
 
@@ -452,6 +521,7 @@ class Connection {
   Connection(HQUIC handle) : handle_(handle), registration_(nullptr) {
     context_ = std::make_unique<ConnectionContext>();
     context_->handle = handle;
+    context_->started = true;
     g_MsQuic->SetCallbackHandler(handle_, (void*)ConnectionCallback, context_.get());
   }
 
@@ -473,6 +543,8 @@ class Connection {
     if (QUIC_FAILED(status)) {
       throw std::runtime_error("Failed to start connection");
     }
+    std::lock_guard<std::mutex> lock(context_->shutdown_mutex);
+    context_->started = true;
   }
 
   void set_configuration(Configuration& config) {
@@ -486,6 +558,49 @@ class Connection {
     g_MsQuic->ConnectionShutdown(handle_, flags, error_code);
   }
 
+  // with 文の終了時に呼ばれる
+  // 接続を閉じて SHUTDOWN_COMPLETE まで待機し、コンテキストを解放できる状態にする
+  // SHUTDOWN_WAIT_TIMEOUT までに SHUTDOWN_COMPLETE が届かない場合は例外を送出する
+  void shutdown_and_wait() {
+    // 自身のコールバックの中で待機すると、SHUTDOWN_COMPLETE を配送するスレッドを
+    // 止めてしまい、SHUTDOWN_COMPLETE が届かない
+    if (t_callback_connection_context == context_.get()) {
+      throw std::runtime_error("Cannot exit a connection context from its own callback");
+    }
+    {
+      std::lock_guard<std::mutex> lock(context_->shutdown_mutex);
+      // 開始していない接続には SHUTDOWN_COMPLETE が届かない
+      // 終了済みの接続はハンドルが Close されているので ConnectionShutdown を呼ばない
+      if (!context_->started || context_->shutdown_completed) {
+        return;
+      }
+      // これ以降に SHUTDOWN_COMPLETE が届いても、コールバックはハンドルを Close しない
+      // そのため、ロックを解放した後も ConnectionShutdown に渡すハンドルは有効なまま
+      context_->exit_in_progress = true;
+    }
+    // GIL を解放して MsQuic API を呼び出し、そのまま待機する
+    // SHUTDOWN_COMPLETE のコールバックは GIL を取得して Python のコールバックを呼び出す
+    nb::gil_scoped_release release;
+    // MsQuic のワーカースレッドから呼ばれた場合、SHUTDOWN_COMPLETE が
+    // ConnectionShutdown の中で同期的に届き、コールバックが shutdown_mutex を取得する
+    // そのため shutdown_mutex を解放してから ConnectionShutdown を呼ぶ
+    g_MsQuic->ConnectionShutdown(handle_, QUIC_CONNECTION_SHUTDOWN_FLAG_NONE, 0);
+    {
+      std::unique_lock<std::mutex> lock(context_->shutdown_mutex);
+      bool completed = context_->shutdown_cv.wait_for(
+          lock, SHUTDOWN_WAIT_TIMEOUT, [this] { return context_->shutdown_completed; });
+      if (!completed) {
+        // 後から届く SHUTDOWN_COMPLETE のコールバックにハンドルの Close を任せる
+        context_->exit_in_progress = false;
+        throw std::runtime_error("Timed out waiting for connection shutdown");
+      }
+    }
+    // SHUTDOWN_COMPLETE はハンドルに届く最後のイベントなので、ここで Close する
+    g_MsQuic->ConnectionClose(handle_);
+    handle_ = nullptr;
+    context_->handle = nullptr;
+  }
+
   std::shared_ptr<Stream> open_stream(QUIC_STREAM_OPEN_FLAGS flags = QUIC_STREAM_OPEN_FLAG_NONE) {
     HQUIC stream_handle = nullptr;
     QUIC_STATUS status = g_MsQuic->StreamOpen(
@@ -505,6 +620,17 @@ class Connection {
     return stream;
   }
 
+  // Stream の作成、開始 (IMMEDIATE)、データ送信を 1 回の呼び出しで行う
+  // 0-RTT のように接続完了を待たずにデータを送る場合に使う
+  std::shared_ptr<Stream> open_and_send(const nb::bytes& data,
+                                        QUIC_STREAM_OPEN_FLAGS open_flags = QUIC_STREAM_OPEN_FLAG_NONE,
+                                        QUIC_SEND_FLAGS send_flags = QUIC_SEND_FLAG_NONE) {
+    auto stream = open_stream(open_flags);
+    stream->start(QUIC_STREAM_START_FLAG_IMMEDIATE);
+    stream->send(data, send_flags);
+    return stream;
+  }
+
   void set_on_connected(std::function<void(bool)> callback) {
     // GIL 保持中に呼ばれる (Python から)
     context_->on_connected = std::move(callback);
@@ -546,7 +672,7 @@ class Connection {
     context_->on_datagram_state_changed = std::move(callback);
   }
 
-  void set_on_datagram_received(std::function<void(const std::vector<uint8_t>&)> callback) {
+  void set_on_datagram_received(std::function<void(nb::bytes)> callback) {
     // GIL 保持中に呼ばれる (Python から)
     context_->on_datagram_received = std::move(callback);
   }
@@ -569,9 +695,12 @@ class Connection {
   }
 
   // Resumption メソッド (クライアント側)
-  void set_resumption_ticket(const nb::bytes& ticket) {
-    // データを先にコピーしておく
-    std::vector<uint8_t> ticket_data(ticket.c_str(), ticket.c_str() + ticket.size());
+  // bytes / bytearray / memoryview などバッファプロトコルに対応したオブジェクトを受け付ける
+  // MsQuic は SetParam の中で Ticket をコピーするため、こちらではコピーしない
+  void set_resumption_ticket(nb::handle ticket) {
+    // ビューを保持している間は bytearray などのサイズ変更ができないため、
+    // GIL を解放してもバッファは有効なまま
+    BufferView ticket_data(ticket);
     QUIC_STATUS status;
     {
       // GIL を解放して MsQuic API を呼び出す
@@ -589,12 +718,12 @@ class Connection {
     }
   }
 
-  void set_on_resumption_ticket_received(std::function<void(const std::vector<uint8_t>&)> callback) {
+  void set_on_resumption_ticket_received(std::function<void(nb::bytes)> callback) {
     // GIL 保持中に呼ばれる (Python から)
     context_->on_resumption_ticket_received = std::move(callback);
   }
 
-  void set_on_resumed(std::function<void(const std::vector<uint8_t>&)> callback) {
+  void set_on_resumed(std::function<void(nb::bytes)> callback) {
     // GIL 保持中に呼ばれる (Python から)
     context_->on_resumed = std::move(callback);
   }
@@ -610,6 +739,7 @@ QUIC_STATUS QUIC_API ConnectionCallback(HQUIC connection, void* context, QUIC_CO
   if (!ctx || ctx->is_closing.load()) {
     return QUIC_STATUS_SUCCESS;
   }
+  CallbackConnectionContextScope callback_scope(ctx);
 
   switch (event->Type) {
     case QUIC_CONNECTION_EVENT_CONNECTED: {
@@ -642,9 +772,19 @@ QUIC_STATUS QUIC_API ConnectionCallback(HQUIC connection, void* context, QUIC_CO
         ctx->on_resumed = nullptr;
         ctx->streams.clear();
       }
+      // with 文の終了を待機しているスレッドに通知する
+      // 通知した後は ctx にアクセスしない (待機していたスレッドがコンテキストを解放する可能性がある)
+      bool exit_in_progress;
+      {
+        std::lock_guard<std::mutex> lock(ctx->shutdown_mutex);
+        ctx->shutdown_completed = true;
+        exit_in_progress = ctx->exit_in_progress;
+        ctx->shutdown_cv.notify_all();
+      }
       // MsQuic のパターン: SHUTDOWN_COMPLETE で ConnectionClose を呼び出す
       // AppCloseInProgress が true の場合、アプリが既に Close を呼んでいるのでスキップ
-      if (!event->SHUTDOWN_COMPLETE.AppCloseInProgress) {
+      // with 文の終了処理が待機している場合は、待機していたスレッドが Close する
+      if (!event->SHUTDOWN_COMPLETE.AppCloseInProgress && !exit_in_progress) {
         g_MsQuic->ConnectionClose(connection);
       }
       break;
@@ -683,14 +823,13 @@ QUIC_STATUS QUIC_API ConnectionCallback(HQUIC connection, void* context, QUIC_CO
       break;
     }
     case QUIC_CONNECTION_EVENT_DATAGRAM_RECEIVED: {
-      // データを先にコピー (GIL 不要)
-      std::vector<uint8_t> data(
-          event->DATAGRAM_RECEIVED.Buffer->Buffer,
-          event->DATAGRAM_RECEIVED.Buffer->Buffer + event->DATAGRAM_RECEIVED.Buffer->Length);
       // GIL を取得してコールバックにアクセス
       nb::gil_scoped_acquire acquire;
       if (ctx->on_datagram_received) {
-        ctx->on_datagram_received(data);
+        // 受信データはイベント中だけ有効なので、std::vector を経由せず 1 回のコピーで bytes を作って渡す
+        ctx->on_datagram_received(nb::bytes(
+            reinterpret_cast<const char*>(event->DATAGRAM_RECEIVED.Buffer->Buffer),
+            event->DATAGRAM_RECEIVED.Buffer->Length));
       }
       break;
     }
@@ -715,27 +854,24 @@ QUIC_STATUS QUIC_API ConnectionCallback(HQUIC connection, void* context, QUIC_CO
       break;
     }
     case QUIC_CONNECTION_EVENT_RESUMPTION_TICKET_RECEIVED: {
-      // データを先にコピー (GIL 不要)
-      std::vector<uint8_t> ticket(
-          event->RESUMPTION_TICKET_RECEIVED.ResumptionTicket,
-          event->RESUMPTION_TICKET_RECEIVED.ResumptionTicket +
-              event->RESUMPTION_TICKET_RECEIVED.ResumptionTicketLength);
       // GIL を取得してコールバックにアクセス
       nb::gil_scoped_acquire acquire;
       if (ctx->on_resumption_ticket_received) {
-        ctx->on_resumption_ticket_received(ticket);
+        // Ticket はイベント中だけ有効なので、std::vector を経由せず 1 回のコピーで bytes を作って渡す
+        ctx->on_resumption_ticket_received(nb::bytes(
+            reinterpret_cast<const char*>(event->RESUMPTION_TICKET_RECEIVED.ResumptionTicket),
+            event->RESUMPTION_TICKET_RECEIVED.ResumptionTicketLength));
       }
       break;
     }
     case QUIC_CONNECTION_EVENT_RESUMED: {
-      // データを先にコピー (GIL 不要)
-      std::vector<uint8_t> resumption_state(
-          event->RESUMED.ResumptionState,
-          event->RESUMED.ResumptionState + event->RESUMED.ResumptionStateLength);
       // GIL を取得してコールバックにアクセス
       nb::gil_scoped_acquire acquire;
       if (ctx->on_resumed) {
-        ctx->on_resumed(resumption_state);
+        // Resumption State はイベント中だけ有効なので、std::vector を経由せず 1 回のコピーで bytes を作って渡す
+        ctx->on_resumed(nb::bytes(
+            reinterpret_cast<const char*>(event->RESUMED.ResumptionState),
+            event->RESUMED.ResumptionStateLength));
       }
       break;
     }
@@ -803,6 +939,20 @@ class Listener {
     }
   }
 
+  // start() で port に 0 を指定した場合に OS が割り当てたポートを確認できる
+  uint16_t local_port() const {
+    if (handle_ == nullptr) {
+      throw std::runtime_error("Listener is closed");
+    }
+    QUIC_ADDR addr = {0};
+    uint32_t size = sizeof(addr);
+    QUIC_STATUS status = g_MsQuic->GetParam(handle_, QUIC_PARAM_LISTENER_LOCAL_ADDRESS, &size, &addr);
+    if (QUIC_FAILED(status)) {
+      throw std::runtime_error("Failed to get listener local address");
+    }
+    return QuicAddrGetPort(&addr);
+  }
+
   void stop() {
     if (handle_ != nullptr && g_MsQuic != nullptr) {
       context_->is_closing.store(true);
@@ -951,24 +1101,27 @@ nb::bytes encode_varint(uint64_t value) {
   return nb::bytes(reinterpret_cast<char*>(buffer), size);
 }
 
-nb::tuple decode_varint(const nb::bytes& data, size_t offset = 0) {
-  size_t buffer_length = data.size();
+// bytes / bytearray / memoryview などバッファプロトコルに対応したオブジェクトを
+// コピーせずにデコードする
+nb::tuple decode_varint(nb::handle data, size_t offset = 0) {
+  BufferView buffer(data);
+  size_t buffer_length = buffer.size();
 
   if (offset >= buffer_length) {
     throw std::out_of_range("Offset is out of range");
   }
 
-  const uint8_t* buffer = reinterpret_cast<const uint8_t*>(data.c_str());
-  uint16_t pos = static_cast<uint16_t>(offset);
+  // QuicVarIntDecode はバッファ長を 16 ビットで扱うため、
+  // offset の位置から varint の最大長 (8 バイト) までを渡す
+  uint16_t length = static_cast<uint16_t>(std::min<size_t>(buffer_length - offset, 8));
+  uint16_t pos = 0;
   QUIC_VAR_INT value;
 
-  if (!QuicVarIntDecode(static_cast<uint16_t>(buffer_length), buffer, &pos,
-                        &value)) {
+  if (!QuicVarIntDecode(length, buffer.data() + offset, &pos, &value)) {
     throw std::runtime_error("Insufficient data for varint decoding");
   }
 
-  size_t consumed = static_cast<size_t>(pos - offset);
-  return nb::make_tuple(value, consumed);
+  return nb::make_tuple(value, static_cast<size_t>(pos));
 }
 
 uint8_t varint_size(uint64_t value) {
@@ -1037,7 +1190,13 @@ void bind_msquic(nb::module_& m) {
       .def("set_configuration", &Connection::set_configuration, "config"_a)
       .def("shutdown", &Connection::shutdown,
            "flags"_a = QUIC_CONNECTION_SHUTDOWN_FLAG_NONE, "error_code"_a = 0)
+      .def("__enter__", [](nb::object self) { return self; })
+      .def("__exit__",
+           [](Connection& self, nb::handle, nb::handle, nb::handle) { self.shutdown_and_wait(); },
+           "exc_type"_a.none(), "exc_value"_a.none(), "traceback"_a.none())
       .def("open_stream", &Connection::open_stream, "flags"_a = QUIC_STREAM_OPEN_FLAG_NONE)
+      .def("open_and_send", &Connection::open_and_send, "data"_a,
+           "open_flags"_a = QUIC_STREAM_OPEN_FLAG_NONE, "send_flags"_a = QUIC_SEND_FLAG_NONE)
       .def("set_on_connected", &Connection::set_on_connected)
       .def("set_on_shutdown_complete", &Connection::set_on_shutdown_complete)
       .def("set_on_peer_stream_started", &Connection::set_on_peer_stream_started)
@@ -1059,5 +1218,6 @@ void bind_msquic(nb::module_& m) {
       .def("start", &Listener::start, "config"_a, "alpn_list"_a, "port"_a)
       .def("stop", &Listener::stop)
       .def("close", &Listener::close)
+      .def_prop_ro("local_port", &Listener::local_port)
       .def("set_on_new_connection", &Listener::set_on_new_connection);
 }
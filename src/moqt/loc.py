@@ -11,6 +11,10 @@ from enum import IntEnum
 from .data_stream import ObjectExtensions
 from .varint import decode_varint, encode_varint
 
+# 8 ビットに収まる値の varint エンコード結果
+# VideoFrameMarking と AudioLevel は値が 8 ビットに固定されているため事前に計算しておく
+_UINT8_VARINT_TABLE: tuple[bytes, ...] = tuple(encode_varint(value) for value in range(256))
+
 
 class LocExtensionType(IntEnum):
     """LOC Header Extension Type
@@ -27,7 +31,7 @@ class LocExtensionType(IntEnum):
     VIDEO_CONFIG = 13
 
 
-@dataclass
+@dataclass(slots=True)
 class CaptureTimestamp:
     """Capture Timestamp
 
@@ -47,7 +51,7 @@ class CaptureTimestamp:
         return cls(microseconds=value)
 
 
-@dataclass
+@dataclass(slots=True)
 class VideoConfig:
     """Video Config
 
@@ -68,7 +72,7 @@ class VideoConfig:
         return cls(codec_config=bytes(data[offset:]))
 
 
-@dataclass
+@dataclass(slots=True)
 class VideoFrameMarking:
     """Video Frame Marking
 
@@ -99,7 +103,7 @@ class VideoFrameMarking:
             value |= 0x04
         value |= (self.temporal_id & 0x07) << 3
         value |= (self.spatial_id & 0x03) << 6
-        return encode_varint(value)
+        return _UINT8_VARINT_TABLE[value]
 
     @classmethod
     def decode(cls, data: bytes, offset: int = 0) -> VideoFrameMarking:
@@ -114,7 +118,7 @@ class VideoFrameMarking:
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class AudioLevel:
     """Audio Level
 
@@ -133,7 +137,7 @@ class AudioLevel:
         value = self.level & 0x7F
         if self.voice_activity:
             value |= 0x80
-        return encode_varint(value)
+        return _UINT8_VARINT_TABLE[value]
 
     @classmethod
     def decode(cls, data: bytes, offset: int = 0) -> AudioLevel:
@@ -145,7 +149,7 @@ class AudioLevel:
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class ParsedLocExtensions:
     """パースされた LOC Extensions"""
 
@@ -179,8 +183,33 @@ def create_loc_extensions(
     return ObjectExtensions(headers=headers)
 
 
+# 映像フレームと音声フレームで典型的な LOC Extensions の組み合わせ
+_VIDEO_EXTENSION_TYPES = frozenset(
+    {LocExtensionType.CAPTURE_TIMESTAMP, LocExtensionType.VIDEO_FRAME_MARKING}
+)
+_AUDIO_EXTENSION_TYPES = frozenset(
+    {LocExtensionType.CAPTURE_TIMESTAMP, LocExtensionType.AUDIO_LEVEL}
+)
+
+
 def parse_loc_extensions(extensions: ObjectExtensions) -> ParsedLocExtensions:
     """ObjectExtensions から LOC Header Extensions をパースする"""
+    headers = extensions.headers
+
+    # 典型的な組み合わせは個別の存在確認をせずに直接デコードする
+    if headers.keys() == _VIDEO_EXTENSION_TYPES:
+        return ParsedLocExtensions(
+            capture_timestamp=CaptureTimestamp.decode(headers[LocExtensionType.CAPTURE_TIMESTAMP]),
+            video_frame_marking=VideoFrameMarking.decode(
+                headers[LocExtensionType.VIDEO_FRAME_MARKING]
+            ),
+        )
+    if headers.keys() == _AUDIO_EXTENSION_TYPES:
+        return ParsedLocExtensions(
+            capture_timestamp=CaptureTimestamp.decode(headers[LocExtensionType.CAPTURE_TIMESTAMP]),
+            audio_level=AudioLevel.decode(headers[LocExtensionType.AUDIO_LEVEL]),
+        )
+
     result = ParsedLocExtensions()
 
     if LocExtensionType.CAPTURE_TIMESTAMP in extensions.headers:
@@ -10,7 +10,7 @@ from dataclasses import dataclass, field
 from enum import IntEnum
 from typing import ClassVar
 
-from .varint import decode_varint, encode_varint
+from .varint import BytesLike, decode_varint, encode_varint
 
 
 class ErrorCode(IntEnum):
@@ -138,7 +138,7 @@ class Location:
         return encode_varint(self.group) + encode_varint(self.object)
 
     @classmethod
-    def decode(cls, data: bytes, offset: int = 0) -> tuple[Location, int]:
+    def decode(cls, data: BytesLike, offset: int = 0) -> tuple[Location, int]:
         """Location をデコードする"""
         group, consumed1 = decode_varint(data, offset)
         obj, consumed2 = decode_varint(data, offset + consumed1)
@@ -162,7 +162,7 @@ class Parameter:
         return result
 
     @classmethod
-    def decode(cls, data: bytes, offset: int = 0) -> tuple[Parameter, int]:
+    def decode(cls, data: BytesLike, offset: int = 0) -> tuple[Parameter, int]:
         """パラメータをデコードする"""
         param_type, consumed = decode_varint(data, offset)
         total_consumed = consumed
@@ -202,7 +202,7 @@ class ControlMessage:
         return result
 
     @classmethod
-    def decode_payload(cls, data: bytes, offset: int = 0) -> ControlMessage:
+    def decode_payload(cls, data: BytesLike, offset: int = 0) -> ControlMessage:
         """ペイロードからメッセージをデコードする"""
         raise NotImplementedError
 
@@ -222,7 +222,7 @@ class ClientSetup(ControlMessage):
         return result
 
     @classmethod
-    def decode_payload(cls, data: bytes, offset: int = 0) -> ClientSetup:
+    def decode_payload(cls, data: BytesLike, offset: int = 0) -> ClientSetup:
         num_params, consumed = decode_varint(data, offset)
         total_consumed = consumed
         parameters = []
@@ -273,7 +273,7 @@ class ServerSetup(ControlMessage):
         return result
 
     @classmethod
-    def decode_payload(cls, data: bytes, offset: int = 0) -> ServerSetup:
+    def decode_payload(cls, data: BytesLike, offset: int = 0) -> ServerSetup:
         num_params, consumed = decode_varint(data, offset)
         total_consumed = consumed
         parameters = []
@@ -313,9 +313,9 @@ class Goaway(ControlMessage):
         return encode_varint(len(uri_bytes)) + uri_bytes
 
     @classmethod
-    def decode_payload(cls, data: bytes, offset: int = 0) -> Goaway:
+    def decode_payload(cls, data: BytesLike, offset: int = 0) -> Goaway:
         uri_len, consumed = decode_varint(data, offset)
-        uri = data[offset + consumed : offset + consumed + uri_len].decode("utf-8")
+        uri = str(data[offset + consumed : offset + consumed + uri_len], "utf-8")
         return cls(new_session_uri=uri)
 
 
@@ -331,7 +331,7 @@ class MaxRequestId(ControlMessage):
         return encode_varint(self.request_id)
 
     @classmethod
-    def decode_payload(cls, data: bytes, offset: int = 0) -> MaxRequestId:
+    def decode_payload(cls, data: BytesLike, offset: int = 0) -> MaxRequestId:
         request_id, _ = decode_varint(data, offset)
         return cls(request_id=request_id)
 
@@ -348,7 +348,7 @@ class RequestsBlocked(ControlMessage):
         return encode_varint(self.maximum_request_id)
 
     @classmethod
-    def decode_payload(cls, data: bytes, offset: int = 0) -> RequestsBlocked:
+    def decode_payload(cls, data: BytesLike, offset: int = 0) -> RequestsBlocked:
         max_id, _ = decode_varint(data, offset)
         return cls(maximum_request_id=max_id)
 
@@ -370,7 +370,7 @@ class RequestOk(ControlMessage):
         return result
 
     @classmethod
-    def decode_payload(cls, data: bytes, offset: int = 0) -> RequestOk:
+    def decode_payload(cls, data: BytesLike, offset: int = 0) -> RequestOk:
         request_id, consumed = decode_varint(data, offset)
         total_consumed = consumed
         num_params, consumed = decode_varint(data, offset + total_consumed)
@@ -402,16 +402,14 @@ class RequestError(ControlMessage):
         return result
 
     @classmethod
-    def decode_payload(cls, data: bytes, offset: int = 0) -> RequestError:
+    def decode_payload(cls, data: BytesLike, offset: int = 0) -> RequestError:
         request_id, consumed = decode_varint(data, offset)
         total_consumed = consumed
         error_code, consumed = decode_varint(data, offset + total_consumed)
         total_consumed += consumed
         reason_len, consumed = decode_varint(data, offset + total_consumed)
         total_consumed += consumed
-        reason = data[offset + total_consumed : offset + total_consumed + reason_len].decode(
-            "utf-8"
-        )
+        reason = str(data[offset + total_consumed : offset + total_consumed + reason_len], "utf-8")
         return cls(request_id=request_id, error_code=error_code, reason_phrase=reason)
 
 
@@ -429,7 +427,7 @@ class TrackNamespace:
         return result
 
     @classmethod
-    def decode(cls, data: bytes, offset: int = 0) -> builtins.tuple[TrackNamespace, int]:
+    def decode(cls, data: BytesLike, offset: int = 0) -> builtins.tuple[TrackNamespace, int]:
         num_elements, consumed = decode_varint(data, offset)
         total_consumed = consumed
         elements = []
@@ -465,7 +463,7 @@ class Subscribe(ControlMessage):
         return result
 
     @classmethod
-    def decode_payload(cls, data: bytes, offset: int = 0) -> Subscribe:
+    def decode_payload(cls, data: BytesLike, offset: int = 0) -> Subscribe:
         request_id, consumed = decode_varint(data, offset)
         total_consumed = consumed
         track_alias, consumed = decode_varint(data, offset + total_consumed)
@@ -509,7 +507,7 @@ class SubscribeOk(ControlMessage):
         return result
 
     @classmethod
-    def decode_payload(cls, data: bytes, offset: int = 0) -> SubscribeOk:
+    def decode_payload(cls, data: BytesLike, offset: int = 0) -> SubscribeOk:
         request_id, consumed = decode_varint(data, offset)
         total_consumed = consumed
         num_params, consumed = decode_varint(data, offset + total_consumed)
@@ -539,7 +537,7 @@ class SubscribeUpdate(ControlMessage):
         return result
 
     @classmethod
-    def decode_payload(cls, data: bytes, offset: int = 0) -> SubscribeUpdate:
+    def decode_payload(cls, data: BytesLike, offset: int = 0) -> SubscribeUpdate:
         request_id, consumed = decode_varint(data, offset)
         total_consumed = consumed
         num_params, consumed = decode_varint(data, offset + total_consumed)
@@ -564,7 +562,7 @@ class Unsubscribe(ControlMessage):
         return encode_varint(self.request_id)
 
     @classmethod
-    def decode_payload(cls, data: bytes, offset: int = 0) -> Unsubscribe:
+    def decode_payload(cls, data: BytesLike, offset: int = 0) -> Unsubscribe:
         request_id, _ = decode_varint(data, offset)
         return cls(request_id=request_id)
 
@@ -593,7 +591,7 @@ class Publish(ControlMessage):
         return result
 
     @classmethod
-    def decode_payload(cls, data: bytes, offset: int = 0) -> Publish:
+    def decode_payload(cls, data: BytesLike, offset: int = 0) -> Publish:
         request_id, consumed = decode_varint(data, offset)
         total_consumed = consumed
         track_alias, consumed = decode_varint(data, offset + total_consumed)
@@ -637,7 +635,7 @@ class PublishOk(ControlMessage):
         return result
 
     @classmethod
-    def decode_payload(cls, data: bytes, offset: int = 0) -> PublishOk:
+    def decode_payload(cls, data: BytesLike, offset: int = 0) -> PublishOk:
         request_id, consumed = decode_varint(data, offset)
         total_consumed = consumed
         num_params, consumed = decode_varint(data, offset + total_consumed)
@@ -669,16 +667,14 @@ class PublishDone(ControlMessage):
         return result
 
     @classmethod
-    def decode_payload(cls, data: bytes, offset: int = 0) -> PublishDone:
+    def decode_payload(cls, data: BytesLike, offset: int = 0) -> PublishDone:
         request_id, consumed = decode_varint(data, offset)
         total_consumed = consumed
         status_code, consumed = decode_varint(data, offset + total_consumed)
         total_consumed += consumed
         reason_len, consumed = decode_varint(data, offset + total_consumed)
         total_consumed += consumed
-        reason = data[offset + total_consumed : offset + total_consumed + reason_len].decode(
-            "utf-8"
-        )
+        reason = str(data[offset + total_consumed : offset + total_consumed + reason_len], "utf-8")
         return cls(request_id=request_id, status_code=status_code, reason_phrase=reason)
 
 
@@ -708,7 +704,7 @@ class Fetch(ControlMessage):
         return result
 
     @classmethod
-    def decode_payload(cls, data: bytes, offset: int = 0) -> Fetch:
+    def decode_payload(cls, data: BytesLike, offset: int = 0) -> Fetch:
         request_id, consumed = decode_varint(data, offset)
         total_consumed = consumed
         track_namespace, consumed = TrackNamespace.decode(data, offset + total_consumed)
@@ -755,7 +751,7 @@ class FetchOk(ControlMessage):
         return result
 
     @classmethod
-    def decode_payload(cls, data: bytes, offset: int = 0) -> FetchOk:
+    def decode_payload(cls, data: BytesLike, offset: int = 0) -> FetchOk:
         request_id, consumed = decode_varint(data, offset)
         total_consumed = consumed
         num_params, consumed = decode_varint(data, offset + total_consumed)
@@ -780,7 +776,7 @@ class FetchCancel(ControlMessage):
         return encode_varint(self.request_id)
 
     @classmethod
-    def decode_payload(cls, data: bytes, offset: int = 0) -> FetchCancel:
+    def decode_payload(cls, data: BytesLike, offset: int = 0) -> FetchCancel:
         request_id, _ = decode_varint(data, offset)
         return cls(request_id=request_id)
 
@@ -807,7 +803,7 @@ class TrackStatus(ControlMessage):
         return result
 
     @classmethod
-    def decode_payload(cls, data: bytes, offset: int = 0) -> TrackStatus:
+    def decode_payload(cls, data: BytesLike, offset: int = 0) -> TrackStatus:
         request_id, consumed = decode_varint(data, offset)
         total_consumed = consumed
         track_namespace, consumed = TrackNamespace.decode(data, offset + total_consumed)
@@ -850,7 +846,7 @@ class PublishNamespace(ControlMessage):
         return result
 
     @classmethod
-    def decode_payload(cls, data: bytes, offset: int = 0) -> PublishNamespace:
+    def decode_payload(cls, data: BytesLike, offset: int = 0) -> PublishNamespace:
         request_id, consumed = decode_varint(data, offset)
         total_consumed = consumed
         track_namespace, consumed = TrackNamespace.decode(data, offset + total_consumed)
@@ -888,16 +884,14 @@ class PublishNamespaceDone(ControlMessage):
         return result
 
     @classmethod
-    def decode_payload(cls, data: bytes, offset: int = 0) -> PublishNamespaceDone:
+    def decode_payload(cls, data: BytesLike, offset: int = 0) -> PublishNamespaceDone:
         request_id, consumed = decode_varint(data, offset)
         total_consumed = consumed
         status_code, consumed = decode_varint(data, offset + total_consumed)
         total_consumed += consumed
         reason_len, consumed = decode_varint(data, offset + total_consumed)
         total_consumed += consumed
-        reason = data[offset + total_consumed : offset + total_consumed + reason_len].decode(
-            "utf-8"
-        )
+        reason = str(data[offset + total_consumed : offset + total_consumed + reason_len], "utf-8")
         return cls(request_id=request_id, status_code=status_code, reason_phrase=reason)
 
 
@@ -913,7 +907,7 @@ class PublishNamespaceCancel(ControlMessage):
         return encode_varint(self.request_id)
 
     @classmethod
-    def decode_payload(cls, data: bytes, offset: int = 0) -> PublishNamespaceCancel:
+    def decode_payload(cls, data: BytesLike, offset: int = 0) -> PublishNamespaceCancel:
         request_id, _ = decode_varint(data, offset)
         return cls(request_id=request_id)
 
@@ -937,7 +931,7 @@ class SubscribeNamespace(ControlMessage):
         return result
 
     @classmethod
-    def decode_payload(cls, data: bytes, offset: int = 0) -> SubscribeNamespace:
+    def decode_payload(cls, data: BytesLike, offset: int = 0) -> SubscribeNamespace:
         request_id, consumed = decode_varint(data, offset)
         total_consumed = consumed
         track_namespace_prefix, consumed = TrackNamespace.decode(data, offset + total_consumed)
@@ -968,7 +962,7 @@ class UnsubscribeNamespace(ControlMessage):
         return encode_varint(self.request_id)
 
     @classmethod
-    def decode_payload(cls, data: bytes, offset: int = 0) -> UnsubscribeNamespace:
+    def decode_payload(cls, data: BytesLike, offset: int = 0) -> UnsubscribeNamespace:
         request_id, _ = decode_varint(data, offset)
         return cls(request_id=request_id)
 
@@ -1001,9 +995,11 @@ MESSAGE_CLASSES: dict[MessageType, type[ControlMessage]] = {
 }
 
 
-def decode_control_message(data: bytes, offset: int = 0) -> tuple[ControlMessage, int]:
+def decode_control_message(data: BytesLike, offset: int = 0) -> tuple[ControlMessage, int]:
     """Control Message をデコードする
 
+    受信バッファの bytearray や memoryview はコピーせずにそのままデコードする
+
     Args:
         data: デコードするバイト列
         offset: 開始オフセット
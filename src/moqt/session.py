@@ -7,7 +7,6 @@ msquic 上での MOQT セッションを管理する
 from __future__ import annotations
 
 import asyncio
-from collections.abc import Sequence
 from dataclasses import dataclass, field
 from enum import Enum, auto
 from typing import Callable
@@ -233,8 +232,8 @@ class MoqtSession:
         """制御ストリームを設定する"""
         self._control_stream = stream
 
-        def on_receive(data: Sequence[int], fin: bool) -> None:
-            self._on_control_stream_receive(bytes(data), fin)
+        def on_receive(data: bytes, fin: bool) -> None:
+            self._on_control_stream_receive(data, fin)
 
         stream.set_on_receive(on_receive)
 
@@ -266,7 +265,7 @@ class MoqtSession:
         """受信バッファからメッセージを処理する"""
         while len(self._receive_buffer) > 0:
             try:
-                message, consumed = decode_control_message(bytes(self._receive_buffer))
+                message, consumed = decode_control_message(self._receive_buffer)
                 del self._receive_buffer[:consumed]
                 self._handle_message(message)
             except ValueError:
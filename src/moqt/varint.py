@@ -12,6 +12,10 @@ from msquic import (
     varint_size as _varint_size,
 )
 
+# デコード関数が受け付けるバイト列の型
+# 受信バッファの bytearray や memoryview はコピーせずにそのまま渡せる
+type BytesLike = bytes | bytearray | memoryview
+
 
 def encode_varint(value: int) -> bytes:
     """整数を QUIC varint 形式にエンコードする
@@ -33,9 +37,11 @@ def encode_varint(value: int) -> bytes:
         raise ValueError(f"varint は 2^62-1 より大きい値をエンコードできません: {value}") from e
 
 
-def decode_varint(data: bytes | memoryview, offset: int = 0) -> tuple[int, int]:
+def decode_varint(data: BytesLike, offset: int = 0) -> tuple[int, int]:
     """QUIC varint 形式からデコードする
 
+    bytearray や memoryview はコピーせずにそのままデコードする
+
     Args:
         data: デコードするバイト列
         offset: 開始オフセット
@@ -46,8 +52,6 @@ def decode_varint(data: bytes | memoryview, offset: int = 0) -> tuple[int, int]:
     Raises:
         ValueError: データが不足している場合
     """
-    if isinstance(data, memoryview):
-        data = bytes(data)
     try:
         return _decode_varint(data, offset)
     except (RuntimeError, IndexError) as e:
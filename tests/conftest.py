@@ -1,9 +1,12 @@
 import asyncio
 import ipaddress
 import socket
+import sys
 import threading
+import time
 import traceback
 from datetime import datetime, timedelta, timezone
+from enum import IntFlag
 
 import pytest
 from aioquic.asyncio import QuicConnectionProtocol, serve
@@ -14,6 +17,16 @@ from cryptography.hazmat.primitives import hashes, serialization
 from cryptography.hazmat.primitives.asymmetric import ec
 from cryptography.x509.oid import NameOID
 
+import msquic
+
+# uvloop は Windows に対応していないので、Windows では標準のイベントループを使う
+if sys.platform != "win32":
+    import uvloop
+
+    def pytest_asyncio_loop_factories(config, item):
+        """pytest-asyncio のテストのイベントループに uvloop を使う"""
+        return {"uvloop": uvloop.new_event_loop}
+
 
 @pytest.fixture
 def sample_alpn():
@@ -21,10 +34,69 @@ def sample_alpn():
 
 
 def get_free_port() -> int:
-    """空いているポートを取得"""
-    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
-        s.bind(("127.0.0.1", 0))
-        return s.getsockname()[1]
+    """aioquic サーバー用に空いているポートを取得する
+
+    msquic の Listener はポートに 0 を指定して local_port で実際のポートを取得する
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def get_aioquic_client_configuration(alpn: list[str]) -> QuicConfiguration:
+    """aioquic クライアント用の QuicConfiguration を返す
+
+    aioquic の connect() は QuicConfiguration に server_name を書き込むので、
+    テスト間で共有せずに呼び出しごとに作成する
+    """
+    configuration = QuicConfiguration(
+        is_client=True,
+        alpn_protocols=alpn,
+    )
+    # サーバー証明書の検証をスキップ
+    configuration.verify_mode = False
+    return configuration
+
+
+def remaining_time(deadline: float) -> float:
+    """time.monotonic() の時刻 deadline までの残り時間 (秒)
+
+    複数の待機に 1 つの期限を設定する場合に、待機ごとの timeout を求める
+    """
+    return max(deadline - time.monotonic(), 0.0)
+
+
+class EventState:
+    """複数のイベントを 1 つの Condition とビットマスクで管理する
+
+    待機するイベントはテストごとに IntFlag で定義する
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._events = 0
+
+    def set(self, event: IntFlag) -> None:
+        with self._condition:
+            # 複数回通知されるコールバックでは設定済みのイベントで待機スレッドを起こさない
+            if self._events & event == event:
+                return
+            self._events |= event
+            self._condition.notify_all()
+
+    def wait(self, events: IntFlag, timeout: float) -> bool:
+        def is_set() -> bool:
+            return self._events & events == events
+
+        with self._condition:
+            return self._condition.wait_for(is_set, timeout=timeout)
+
+    def wait_until(self, events: IntFlag, deadline: float) -> bool:
+        """time.monotonic() の時刻 deadline までイベントを待機する
+
+        複数のイベントを順に待つ場合に、待機ごとではなくまとめて制限時間を設定する
+        """
+        return self.wait(events, timeout=remaining_time(deadline))
 
 
 @pytest.fixture(scope="session")
@@ -184,3 +256,36 @@ def quic_server(certificates):
         "certificates": certificates,
     }
     server.stop()
+
+
+@pytest.fixture(scope="session")
+def msquic_client_registration():
+    """msquic クライアント用の Registration をセッション全体で共有するフィクスチャ
+
+    Registration はワーカースレッドを持つため、テストごとに作り直さない
+    """
+    return msquic.Registration("test_client", msquic.ExecutionProfile.LOW_LATENCY)
+
+
+@pytest.fixture(scope="session")
+def msquic_client_configuration(msquic_client_registration):
+    """ALPN ごとに msquic クライアント用の Configuration を共有するフィクスチャ
+
+    サーバー証明書の検証は行わない
+    """
+    configurations: dict[tuple[str, ...], msquic.Configuration] = {}
+
+    def get_configuration(alpn: list[str]) -> msquic.Configuration:
+        key = tuple(alpn)
+        config = configurations.get(key)
+        if config is None:
+            config = msquic.Configuration(
+                msquic_client_registration,
+                alpn,
+                idle_timeout_ms=5000,
+            )
+            config.load_credential_none(no_certificate_validation=True)
+            configurations[key] = config
+        return config
+
+    return get_configuration
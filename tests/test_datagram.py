@@ -3,25 +3,36 @@
 msquic の DATAGRAM 機能をテストする
 """
 
-import threading
+import os
+from concurrent.futures import Future
+from enum import IntFlag, auto
 
 import msquic
 
-from conftest import get_free_port
+from conftest import EventState
+
+# QUIC の最小 MTU 相当のペイロードを一度だけ生成して使い回す
+_DATAGRAM_PAYLOAD = os.urandom(1200)
+
+
+class _DatagramEvent(IntFlag):
+    """DATAGRAM テストで待機するイベント"""
+
+    CLIENT_CONNECTED = auto()
+    SERVER_CONNECTED = auto()
+    CLIENT_SHUTDOWN = auto()
+    SERVER_SHUTDOWN = auto()
+    CLIENT_DATAGRAM_READY = auto()
+    CLIENT_DATAGRAM_RECEIVED = auto()
+    SERVER_DATAGRAM_RECEIVED = auto()
 
 
 def test_datagram_send_receive(certificates):
     """DATAGRAM 送受信テスト"""
-    port = get_free_port()
-    server_connected_event = threading.Event()
-    client_connected_event = threading.Event()
-    client_shutdown_event = threading.Event()
-    server_shutdown_event = threading.Event()
-    datagram_received_event = threading.Event()
-    datagram_state_event = threading.Event()
-    received_datagrams = []
-    datagram_send_enabled = [False]
-    max_send_length = [0]
+    state = EventState()
+    # 送信可能になったときの最大送信長
+    datagram_state_future: Future[int] = Future()
+    received_datagrams: list[bytes] = []
 
     # サーバー側
     server_reg = msquic.Registration("datagram_server", msquic.ExecutionProfile.LOW_LATENCY)
@@ -44,18 +55,20 @@ def test_datagram_send_receive(certificates):
         server_connections.append(server_conn)
 
         def on_datagram_received(data):
-            received_datagrams.append(bytes(data))
-            datagram_received_event.set()
+            received_datagrams.append(data)
+            state.set(_DatagramEvent.SERVER_DATAGRAM_RECEIVED)
 
         def on_server_shutdown_complete(_app_close_in_progress):
-            server_shutdown_event.set()
+            state.set(_DatagramEvent.SERVER_SHUTDOWN)
 
         server_conn.set_on_datagram_received(on_datagram_received)
         server_conn.set_on_shutdown_complete(on_server_shutdown_complete)
-        server_connected_event.set()
+        state.set(_DatagramEvent.SERVER_CONNECTED)
 
     listener.set_on_new_connection(on_new_connection)
-    listener.start(server_config, ["datagram-test"], port)
+    # ポートに 0 を指定して OS に割り当てさせ、実際のポートを Listener から取得する
+    listener.start(server_config, ["datagram-test"], 0)
+    port = listener.local_port
 
     # クライアント側
     client_reg = msquic.Registration("datagram_client", msquic.ExecutionProfile.LOW_LATENCY)
@@ -70,15 +83,15 @@ def test_datagram_send_receive(certificates):
     conn = msquic.Connection(client_reg)
 
     def on_connected(_session_resumed):
-        client_connected_event.set()
+        state.set(_DatagramEvent.CLIENT_CONNECTED)
 
     def on_shutdown_complete(_app_close_in_progress):
-        client_shutdown_event.set()
+        state.set(_DatagramEvent.CLIENT_SHUTDOWN)
 
     def on_datagram_state_changed(send_enabled, length):
-        datagram_send_enabled[0] = send_enabled
-        max_send_length[0] = length
-        datagram_state_event.set()
+        # 状態変更は複数回通知されることがあるので、送信可能になった最初の通知だけを使う
+        if send_enabled and not datagram_state_future.done():
+            datagram_state_future.set_result(length)
 
     conn.set_on_connected(on_connected)
     conn.set_on_shutdown_complete(on_shutdown_complete)
@@ -88,41 +101,36 @@ def test_datagram_send_receive(certificates):
     conn.start(client_config, "127.0.0.1", port)
 
     # 接続完了を待機
-    assert client_connected_event.wait(timeout=5.0), "Client connection timeout"
-    assert server_connected_event.wait(timeout=5.0), "Server connection timeout"
+    assert state.wait(_DatagramEvent.CLIENT_CONNECTED, timeout=5.0), "Client connection timeout"
+    assert state.wait(_DatagramEvent.SERVER_CONNECTED, timeout=5.0), "Server connection timeout"
 
     # DATAGRAM 状態変更を待機
-    assert datagram_state_event.wait(timeout=5.0), "Datagram state change timeout"
-    assert datagram_send_enabled[0], "Datagram send should be enabled"
-    assert max_send_length[0] > 0, "Max send length should be > 0"
+    max_send_length = datagram_state_future.result(timeout=5.0)
+    assert max_send_length > 0, "Max send length should be > 0"
 
-    # DATAGRAM を送信
-    test_data = b"Hello, DATAGRAM!"
+    # 送信可能な最大長の DATAGRAM を送信
+    test_data = _DATAGRAM_PAYLOAD[:max_send_length]
     conn.send_datagram(test_data)
 
     # 受信を待機
-    assert datagram_received_event.wait(timeout=5.0), "Datagram receive timeout"
+    assert state.wait(_DatagramEvent.SERVER_DATAGRAM_RECEIVED, timeout=5.0), (
+        "Datagram receive timeout"
+    )
     assert len(received_datagrams) == 1
     assert received_datagrams[0] == test_data
 
     # クリーンアップ
     conn.shutdown(msquic.ConnectionShutdownFlags.NONE, 0)
-    assert client_shutdown_event.wait(timeout=5.0), "Client shutdown timeout"
-    assert server_shutdown_event.wait(timeout=5.0), "Server shutdown timeout"
+    assert state.wait(_DatagramEvent.CLIENT_SHUTDOWN, timeout=5.0), "Client shutdown timeout"
+    assert state.wait(_DatagramEvent.SERVER_SHUTDOWN, timeout=5.0), "Server shutdown timeout"
     listener.close()
 
 
 def test_datagram_bidirectional(certificates):
     """DATAGRAM 双方向送受信テスト"""
-    port = get_free_port()
-    server_connected_event = threading.Event()
-    client_connected_event = threading.Event()
-    client_shutdown_event = threading.Event()
-    server_shutdown_event = threading.Event()
-    client_datagram_received_event = threading.Event()
-    server_datagram_received_event = threading.Event()
-    client_received_datagrams = []
-    server_received_datagrams = []
+    state = EventState()
+    client_received_datagrams: list[bytes] = []
+    server_received_datagrams: list[bytes] = []
 
     # サーバー側
     server_reg = msquic.Registration("datagram_server", msquic.ExecutionProfile.LOW_LATENCY)
@@ -145,24 +153,26 @@ def test_datagram_bidirectional(certificates):
         server_connections.append(server_conn)
 
         def on_server_datagram_received(data):
-            server_received_datagrams.append(bytes(data))
-            server_datagram_received_event.set()
+            server_received_datagrams.append(data)
+            state.set(_DatagramEvent.SERVER_DATAGRAM_RECEIVED)
             # エコーバック
-            server_conn.send_datagram(bytes(data))
+            server_conn.send_datagram(data)
 
         def on_server_datagram_state_changed(send_enabled, length):
             if send_enabled:
-                server_connected_event.set()
+                state.set(_DatagramEvent.SERVER_CONNECTED)
 
         def on_server_shutdown_complete(_app_close_in_progress):
-            server_shutdown_event.set()
+            state.set(_DatagramEvent.SERVER_SHUTDOWN)
 
         server_conn.set_on_datagram_received(on_server_datagram_received)
         server_conn.set_on_datagram_state_changed(on_server_datagram_state_changed)
         server_conn.set_on_shutdown_complete(on_server_shutdown_complete)
 
     listener.set_on_new_connection(on_new_connection)
-    listener.start(server_config, ["datagram-test"], port)
+    # ポートに 0 を指定して OS に割り当てさせ、実際のポートを Listener から取得する
+    listener.start(server_config, ["datagram-test"], 0)
+    port = listener.local_port
 
     # クライアント側
     client_reg = msquic.Registration("datagram_client", msquic.ExecutionProfile.LOW_LATENCY)
@@ -175,21 +185,20 @@ def test_datagram_bidirectional(certificates):
     client_config.load_credential_none(no_certificate_validation=True)
 
     conn = msquic.Connection(client_reg)
-    datagram_ready_event = threading.Event()
 
     def on_connected(_session_resumed):
-        client_connected_event.set()
+        state.set(_DatagramEvent.CLIENT_CONNECTED)
 
     def on_shutdown_complete(_app_close_in_progress):
-        client_shutdown_event.set()
+        state.set(_DatagramEvent.CLIENT_SHUTDOWN)
 
     def on_datagram_state_changed(send_enabled, length):
         if send_enabled:
-            datagram_ready_event.set()
+            state.set(_DatagramEvent.CLIENT_DATAGRAM_READY)
 
     def on_client_datagram_received(data):
-        client_received_datagrams.append(bytes(data))
-        client_datagram_received_event.set()
+        client_received_datagrams.append(data)
+        state.set(_DatagramEvent.CLIENT_DATAGRAM_RECEIVED)
 
     conn.set_on_connected(on_connected)
     conn.set_on_shutdown_complete(on_shutdown_complete)
@@ -200,24 +209,28 @@ def test_datagram_bidirectional(certificates):
     conn.start(client_config, "127.0.0.1", port)
 
     # 接続完了を待機
-    assert client_connected_event.wait(timeout=5.0), "Client connection timeout"
-    assert server_connected_event.wait(timeout=5.0), "Server connection timeout"
-    assert datagram_ready_event.wait(timeout=5.0), "Datagram ready timeout"
+    assert state.wait(_DatagramEvent.CLIENT_CONNECTED, timeout=5.0), "Client connection timeout"
+    assert state.wait(_DatagramEvent.SERVER_CONNECTED, timeout=5.0), "Server connection timeout"
+    assert state.wait(_DatagramEvent.CLIENT_DATAGRAM_READY, timeout=5.0), "Datagram ready timeout"
 
     # クライアントから DATAGRAM を送信
     test_data = b"Bidirectional DATAGRAM"
     conn.send_datagram(test_data)
 
     # サーバーでの受信を待機
-    assert server_datagram_received_event.wait(timeout=5.0), "Server datagram receive timeout"
+    assert state.wait(_DatagramEvent.SERVER_DATAGRAM_RECEIVED, timeout=5.0), (
+        "Server datagram receive timeout"
+    )
     assert server_received_datagrams[0] == test_data
 
     # クライアントでのエコーバックを待機
-    assert client_datagram_received_event.wait(timeout=5.0), "Client datagram receive timeout"
+    assert state.wait(_DatagramEvent.CLIENT_DATAGRAM_RECEIVED, timeout=5.0), (
+        "Client datagram receive timeout"
+    )
     assert client_received_datagrams[0] == test_data
 
     # クリーンアップ
     conn.shutdown(msquic.ConnectionShutdownFlags.NONE, 0)
-    assert client_shutdown_event.wait(timeout=5.0), "Client shutdown timeout"
-    assert server_shutdown_event.wait(timeout=5.0), "Server shutdown timeout"
+    assert state.wait(_DatagramEvent.CLIENT_SHUTDOWN, timeout=5.0), "Client shutdown timeout"
+    assert state.wait(_DatagramEvent.SERVER_SHUTDOWN, timeout=5.0), "Server shutdown timeout"
     listener.close()
@@ -1,5 +1,7 @@
 """LOC (Low Overhead Container) のテスト"""
 
+import pytest
+
 from moqt.loc import (
     LocExtensionType,
     CaptureTimestamp,
@@ -10,6 +12,7 @@ from moqt.loc import (
     parse_loc_extensions,
 )
 from moqt.data_stream import ObjectExtensions
+from moqt.varint import encode_varint
 
 
 # CaptureTimestamp のテスト
@@ -102,6 +105,13 @@ def test_video_frame_marking_encode_decode_with_layers():
     assert decoded.spatial_id == 3
 
 
+@pytest.mark.parametrize("value", range(256))
+def test_video_frame_marking_encode_matches_varint(value):
+    """全ビットパターンで encode_varint と同じバイト列になる"""
+    marking = VideoFrameMarking.decode(encode_varint(value))
+    assert marking.encode() == encode_varint(value)
+
+
 # AudioLevel のテスト
 
 
@@ -131,6 +141,13 @@ def test_audio_level_encode_decode_max_level():
     assert decoded.level == 0
 
 
+@pytest.mark.parametrize("value", range(256))
+def test_audio_level_encode_matches_varint(value):
+    """全ビットパターンで encode_varint と同じバイト列になる"""
+    level = AudioLevel.decode(encode_varint(value))
+    assert level.encode() == encode_varint(value)
+
+
 # LOC Extensions 統合テスト
 
 
@@ -261,3 +278,31 @@ def test_loc_extensions_roundtrip_through_object_extensions():
     assert parsed.capture_timestamp.microseconds == 7000000
     assert parsed.video_frame_marking is not None
     assert parsed.video_frame_marking.independent is True
+
+
+def test_loc_extensions_parse_video_with_config():
+    """典型的な組み合わせ以外の LOC Extensions をパース"""
+    timestamp = CaptureTimestamp(microseconds=8000000)
+    config = VideoConfig(codec_config=b"\x01\x42\xE0\x1E")
+    frame_marking = VideoFrameMarking(
+        independent=True,
+        discardable=False,
+        base_layer_sync=True,
+        temporal_id=0,
+        spatial_id=0,
+    )
+
+    ext = create_loc_extensions(
+        capture_timestamp=timestamp,
+        video_config=config,
+        video_frame_marking=frame_marking,
+    )
+
+    parsed = parse_loc_extensions(ext)
+
+    assert parsed.capture_timestamp is not None
+    assert parsed.capture_timestamp.microseconds == 8000000
+    assert parsed.video_config is not None
+    assert parsed.video_config.codec_config == b"\x01\x42\xE0\x1E"
+    assert parsed.video_frame_marking is not None
+    assert parsed.audio_level is None
@@ -1,5 +1,7 @@
 """MOQT モジュールのテスト"""
 
+from enum import IntEnum
+
 import pytest
 
 from moqt.varint import decode_varint, encode_varint, varint_size
@@ -45,75 +47,75 @@ from moqt.session import (
 )
 
 
-# Varint のテスト
-
-
-def test_varint_encode_1byte():
-    """1 バイト varint のエンコード"""
-    assert encode_varint(0) == b"\x00"
-    assert encode_varint(1) == b"\x01"
-    assert encode_varint(63) == b"\x3f"
-
-
-def test_varint_encode_2bytes():
-    """2 バイト varint のエンコード"""
-    assert encode_varint(64) == b"\x40\x40"
-    assert encode_varint(16383) == b"\x7f\xff"
-
-
-def test_varint_encode_4bytes():
-    """4 バイト varint のエンコード"""
-    assert encode_varint(16384) == b"\x80\x00\x40\x00"
-    assert encode_varint(1073741823) == b"\xbf\xff\xff\xff"
-
-
-def test_varint_encode_8bytes():
-    """8 バイト varint のエンコード"""
-    assert encode_varint(1073741824) == b"\xc0\x00\x00\x00\x40\x00\x00\x00"
+def _roundtrip(msg, cls):
+    """制御メッセージをエンコード/デコードし、デコード結果の型を確認して返す"""
+    encoded = msg.encode()
+    decoded, consumed = decode_control_message(encoded)
+    assert isinstance(decoded, cls)
+    assert consumed == len(encoded)
+    return decoded
 
 
-def test_varint_decode_1byte():
-    """1 バイト varint のデコード"""
-    assert decode_varint(b"\x00") == (0, 1)
-    assert decode_varint(b"\x01") == (1, 1)
-    assert decode_varint(b"\x3f") == (63, 1)
+# Varint のテスト
 
 
-def test_varint_decode_2bytes():
-    """2 バイト varint のデコード"""
-    assert decode_varint(b"\x40\x40") == (64, 2)
-    assert decode_varint(b"\x7f\xff") == (16383, 2)
+# (値, エンコード結果) の組み合わせ
+# 1 / 2 / 4 / 8 バイトそれぞれの境界値を含む
+VARINT_CASES = [
+    (0, b"\x00"),
+    (1, b"\x01"),
+    (63, b"\x3f"),
+    (64, b"\x40\x40"),
+    (16383, b"\x7f\xff"),
+    (16384, b"\x80\x00\x40\x00"),
+    (1073741823, b"\xbf\xff\xff\xff"),
+    (1073741824, b"\xc0\x00\x00\x00\x40\x00\x00\x00"),
+]
 
 
-def test_varint_decode_4bytes():
-    """4 バイト varint のデコード"""
-    assert decode_varint(b"\x80\x00\x40\x00") == (16384, 4)
-    assert decode_varint(b"\xbf\xff\xff\xff") == (1073741823, 4)
+@pytest.mark.parametrize("value, encoded", VARINT_CASES)
+def test_varint_encode(value, encoded):
+    """varint のエンコード"""
+    assert encode_varint(value) == encoded
 
 
-def test_varint_decode_8bytes():
-    """8 バイト varint のデコード"""
-    assert decode_varint(b"\xc0\x00\x00\x00\x40\x00\x00\x00") == (1073741824, 8)
+@pytest.mark.parametrize("value, encoded", VARINT_CASES)
+def test_varint_decode(value, encoded):
+    """varint のデコード"""
+    assert decode_varint(encoded) == (value, len(encoded))
 
 
 def test_varint_roundtrip():
     """エンコード/デコードのラウンドトリップ"""
-    test_values = [0, 1, 63, 64, 16383, 16384, 1073741823, 1073741824]
-    for value in test_values:
-        encoded = encode_varint(value)
-        decoded, _ = decode_varint(encoded)
-        assert decoded == value
-
-
-def test_varint_size():
+    # 各バイト幅の境界値と、62 ビットの範囲に散らばる 2 のべき乗
+    test_values = [
+        0,
+        2**6 - 1,
+        2**6,
+        2**14 - 1,
+        2**14,
+        2**30 - 1,
+        2**30,
+        2**62 - 1,
+        *(1 << i for i in range(0, 62, 3)),
+    ]
+    encoded_values = list(map(encode_varint, test_values))
+    decoded_values = list(map(decode_varint, encoded_values))
+    assert [value for value, _ in decoded_values] == test_values
+    assert [consumed for _, consumed in decoded_values] == list(map(len, encoded_values))
+
+
+@pytest.mark.parametrize("buffer_type", [bytearray, memoryview])
+def test_varint_decode_buffer(buffer_type):
+    """bytearray / memoryview からのデコード"""
+    data = buffer_type(b"\x00\x80\x00\x40\x00")
+    assert decode_varint(data, 1) == (16384, 4)
+
+
+@pytest.mark.parametrize("value, encoded", VARINT_CASES)
+def test_varint_size(value, encoded):
     """varint サイズの計算"""
-    assert varint_size(0) == 1
-    assert varint_size(63) == 1
-    assert varint_size(64) == 2
-    assert varint_size(16383) == 2
-    assert varint_size(16384) == 4
-    assert varint_size(1073741823) == 4
-    assert varint_size(1073741824) == 8
+    assert varint_size(value) == len(encoded)
 
 
 def test_varint_negative_value_error():
@@ -173,9 +175,7 @@ def test_track_namespace_encode_decode_multiple():
 def test_client_setup_encode_decode_empty():
     """パラメータなしの CLIENT_SETUP"""
     setup = ClientSetup()
-    encoded = setup.encode()
-    decoded, consumed = decode_control_message(encoded)
-    assert isinstance(decoded, ClientSetup)
+    decoded = _roundtrip(setup, ClientSetup)
     assert len(decoded.parameters) == 0
 
 
@@ -183,9 +183,7 @@ def test_client_setup_encode_decode_with_path():
     """PATH パラメータ付きの CLIENT_SETUP"""
     setup = ClientSetup()
     setup.set_path("/test/path")
-    encoded = setup.encode()
-    decoded, consumed = decode_control_message(encoded)
-    assert isinstance(decoded, ClientSetup)
+    decoded = _roundtrip(setup, ClientSetup)
     path_param = decoded.get_parameter(ParameterType.PATH)
     assert path_param is not None
     assert path_param.value == b"/test/path"
@@ -195,9 +193,7 @@ def test_client_setup_encode_decode_with_max_request_id():
     """MAX_REQUEST_ID パラメータ付きの CLIENT_SETUP"""
     setup = ClientSetup()
     setup.set_max_request_id(100)
-    encoded = setup.encode()
-    decoded, consumed = decode_control_message(encoded)
-    assert isinstance(decoded, ClientSetup)
+    decoded = _roundtrip(setup, ClientSetup)
     max_id_param = decoded.get_parameter(ParameterType.MAX_REQUEST_ID)
     assert max_id_param is not None
 
@@ -208,9 +204,7 @@ def test_client_setup_encode_decode_with_max_request_id():
 def test_server_setup_encode_decode_empty():
     """パラメータなしの SERVER_SETUP"""
     setup = ServerSetup()
-    encoded = setup.encode()
-    decoded, consumed = decode_control_message(encoded)
-    assert isinstance(decoded, ServerSetup)
+    decoded = _roundtrip(setup, ServerSetup)
     assert len(decoded.parameters) == 0
 
 
@@ -218,9 +212,8 @@ def test_server_setup_encode_decode_with_max_request_id():
     """MAX_REQUEST_ID パラメータ付きの SERVER_SETUP"""
     setup = ServerSetup()
     setup.set_max_request_id(200)
-    encoded = setup.encode()
-    decoded, consumed = decode_control_message(encoded)
-    assert isinstance(decoded, ServerSetup)
+    decoded = _roundtrip(setup, ServerSetup)
+    assert decoded.get_parameter(ParameterType.MAX_REQUEST_ID) is not None
 
 
 # Goaway のテスト
@@ -229,18 +222,14 @@ def test_server_setup_encode_decode_with_max_request_id():
 def test_goaway_encode_decode_empty_uri():
     """空の URI"""
     goaway = Goaway()
-    encoded = goaway.encode()
-    decoded, consumed = decode_control_message(encoded)
-    assert isinstance(decoded, Goaway)
+    decoded = _roundtrip(goaway, Goaway)
     assert decoded.new_session_uri == ""
 
 
 def test_goaway_encode_decode_with_uri():
     """URI 付き"""
     goaway = Goaway(new_session_uri="moqt://example.com/new")
-    encoded = goaway.encode()
-    decoded, consumed = decode_control_message(encoded)
-    assert isinstance(decoded, Goaway)
+    decoded = _roundtrip(goaway, Goaway)
     assert decoded.new_session_uri == "moqt://example.com/new"
 
 
@@ -250,9 +239,7 @@ def test_goaway_encode_decode_with_uri():
 def test_max_request_id_encode_decode():
     """エンコード/デコード"""
     msg = MaxRequestId(request_id=1000)
-    encoded = msg.encode()
-    decoded, consumed = decode_control_message(encoded)
-    assert isinstance(decoded, MaxRequestId)
+    decoded = _roundtrip(msg, MaxRequestId)
     assert decoded.request_id == 1000
 
 
@@ -262,9 +249,7 @@ def test_max_request_id_encode_decode():
 def test_request_ok_encode_decode():
     """エンコード/デコード"""
     msg = RequestOk(request_id=42)
-    encoded = msg.encode()
-    decoded, consumed = decode_control_message(encoded)
-    assert isinstance(decoded, RequestOk)
+    decoded = _roundtrip(msg, RequestOk)
     assert decoded.request_id == 42
 
 
@@ -274,9 +259,7 @@ def test_request_ok_encode_decode():
 def test_request_error_encode_decode():
     """エンコード/デコード"""
     msg = RequestError(request_id=42, error_code=1, reason_phrase="Test error")
-    encoded = msg.encode()
-    decoded, consumed = decode_control_message(encoded)
-    assert isinstance(decoded, RequestError)
+    decoded = _roundtrip(msg, RequestError)
     assert decoded.request_id == 42
     assert decoded.error_code == 1
     assert decoded.reason_phrase == "Test error"
@@ -293,9 +276,7 @@ def test_subscribe_encode_decode():
         track_namespace=TrackNamespace(tuple=[b"live", b"stream"]),
         track_name=b"video",
     )
-    encoded = msg.encode()
-    decoded, consumed = decode_control_message(encoded)
-    assert isinstance(decoded, Subscribe)
+    decoded = _roundtrip(msg, Subscribe)
     assert decoded.request_id == 10
     assert decoded.track_alias == 1
     assert decoded.track_namespace.tuple == [b"live", b"stream"]
@@ -313,9 +294,7 @@ def test_publish_encode_decode():
         track_namespace=TrackNamespace(tuple=[b"broadcast"]),
         track_name=b"audio",
     )
-    encoded = msg.encode()
-    decoded, consumed = decode_control_message(encoded)
-    assert isinstance(decoded, Publish)
+    decoded = _roundtrip(msg, Publish)
     assert decoded.request_id == 20
     assert decoded.track_alias == 2
     assert decoded.track_namespace.tuple == [b"broadcast"]
@@ -328,48 +307,48 @@ def test_publish_encode_decode():
 def test_publish_done_encode_decode():
     """エンコード/デコード"""
     msg = PublishDone(request_id=30, status_code=0, reason_phrase="Completed")
-    encoded = msg.encode()
-    decoded, consumed = decode_control_message(encoded)
-    assert isinstance(decoded, PublishDone)
+    decoded = _roundtrip(msg, PublishDone)
     assert decoded.request_id == 30
     assert decoded.status_code == 0
     assert decoded.reason_phrase == "Completed"
 
 
-# ErrorCode のテスト
-
-
-def test_error_code_values():
-    """エラーコードの値を確認"""
-    assert ErrorCode.NO_ERROR == 0x0
-    assert ErrorCode.INTERNAL_ERROR == 0x1
-    assert ErrorCode.UNAUTHORIZED == 0x2
-    assert ErrorCode.PROTOCOL_VIOLATION == 0x3
-    assert ErrorCode.DUPLICATE_TRACK_ALIAS == 0x4
-    assert ErrorCode.PARAMETER_LENGTH_MISMATCH == 0x5
-    assert ErrorCode.TOO_MANY_SUBSCRIBERS == 0x6
-    assert ErrorCode.GOAWAY_TIMEOUT == 0x10
-
-
-# TrackStatusCode のテスト
-
-
-def test_track_status_code_values():
-    """ステータスコードの値を確認"""
-    assert TrackStatusCode.IN_PROGRESS == 0x0
-    assert TrackStatusCode.TRACK_DOES_NOT_EXIST == 0x1
-    assert TrackStatusCode.NO_OBJECTS == 0x2
-    assert TrackStatusCode.GROUP_DOES_NOT_EXIST == 0x3
-
-
-# StreamType のテスト
-
-
-def test_stream_type_values():
-    """ストリームタイプの値を確認"""
-    assert StreamType.CONTROL == 0x00
-    assert StreamType.SUBGROUP == 0x04
-    assert StreamType.FETCH == 0x05
+# Enum 値のテスト
+
+
+def _enum_value_id(value):
+    """test_enum_value のテスト ID (Enum のメンバーは型名付きの名前、値は 16 進数)"""
+    if isinstance(value, IntEnum):
+        return f"{type(value).__name__}.{value.name}"
+    return hex(value)
+
+
+@pytest.mark.parametrize(
+    "member, value",
+    [
+        (ErrorCode.NO_ERROR, 0x0),
+        (ErrorCode.INTERNAL_ERROR, 0x1),
+        (ErrorCode.UNAUTHORIZED, 0x2),
+        (ErrorCode.PROTOCOL_VIOLATION, 0x3),
+        (ErrorCode.DUPLICATE_TRACK_ALIAS, 0x4),
+        (ErrorCode.PARAMETER_LENGTH_MISMATCH, 0x5),
+        (ErrorCode.TOO_MANY_SUBSCRIBERS, 0x6),
+        (ErrorCode.GOAWAY_TIMEOUT, 0x10),
+        (TrackStatusCode.IN_PROGRESS, 0x0),
+        (TrackStatusCode.TRACK_DOES_NOT_EXIST, 0x1),
+        (TrackStatusCode.NO_OBJECTS, 0x2),
+        (TrackStatusCode.GROUP_DOES_NOT_EXIST, 0x3),
+        (StreamType.CONTROL, 0x00),
+        (StreamType.SUBGROUP, 0x04),
+        (StreamType.FETCH, 0x05),
+        (GroupOrder.ASCENDING, 0x01),
+        (GroupOrder.DESCENDING, 0x02),
+    ],
+    ids=_enum_value_id,
+)
+def test_enum_value(member, value):
+    """エラーコード / ステータスコード / ストリームタイプ / グループ順序の値を確認"""
+    assert member == value
 
 
 # SubscriptionFilter のテスト
@@ -427,7 +406,7 @@ def test_subscription_filter_absolute_range():
 def test_subscription_filter_absolute_start_missing_fields():
     """ABSOLUTE_START で必須フィールドがない場合のエラー"""
     filter_obj = SubscriptionFilter(filter_type=FilterType.ABSOLUTE_START)
-    with pytest.raises(ValueError):
+    with pytest.raises(ValueError, match="ABSOLUTE_START"):
         filter_obj.encode()
 
 
@@ -438,7 +417,7 @@ def test_subscription_filter_absolute_range_missing_fields():
         start_group=10,
         start_object=5,
     )
-    with pytest.raises(ValueError):
+    with pytest.raises(ValueError, match="ABSOLUTE_RANGE"):
         filter_obj.encode()
 
 
@@ -454,9 +433,7 @@ def test_fetch_encode_decode():
         start=Location(group=0, object=0),
         end=Location(group=10, object=100),
     )
-    encoded = msg.encode()
-    decoded, consumed = decode_control_message(encoded)
-    assert isinstance(decoded, Fetch)
+    decoded = _roundtrip(msg, Fetch)
     assert decoded.request_id == 100
     assert decoded.track_namespace.tuple == [b"media", b"video"]
     assert decoded.track_name == b"stream1"
@@ -472,9 +449,7 @@ def test_fetch_encode_decode():
 def test_fetch_ok_encode_decode():
     """エンコード/デコード"""
     msg = FetchOk(request_id=100)
-    encoded = msg.encode()
-    decoded, consumed = decode_control_message(encoded)
-    assert isinstance(decoded, FetchOk)
+    decoded = _roundtrip(msg, FetchOk)
     assert decoded.request_id == 100
 
 
@@ -484,9 +459,7 @@ def test_fetch_ok_encode_decode():
 def test_fetch_cancel_encode_decode():
     """エンコード/デコード"""
     msg = FetchCancel(request_id=100)
-    encoded = msg.encode()
-    decoded, consumed = decode_control_message(encoded)
-    assert isinstance(decoded, FetchCancel)
+    decoded = _roundtrip(msg, FetchCancel)
     assert decoded.request_id == 100
 
 
@@ -500,9 +473,7 @@ def test_track_status_encode_decode():
         track_namespace=TrackNamespace(tuple=[b"live"]),
         track_name=b"video",
     )
-    encoded = msg.encode()
-    decoded, consumed = decode_control_message(encoded)
-    assert isinstance(decoded, TrackStatus)
+    decoded = _roundtrip(msg, TrackStatus)
     assert decoded.request_id == 50
     assert decoded.track_namespace.tuple == [b"live"]
     assert decoded.track_name == b"video"
@@ -517,9 +488,7 @@ def test_publish_namespace_encode_decode():
         request_id=60,
         track_namespace=TrackNamespace(tuple=[b"media", b"streams"]),
     )
-    encoded = msg.encode()
-    decoded, consumed = decode_control_message(encoded)
-    assert isinstance(decoded, PublishNamespace)
+    decoded = _roundtrip(msg, PublishNamespace)
     assert decoded.request_id == 60
     assert decoded.track_namespace.tuple == [b"media", b"streams"]
 
@@ -534,9 +503,7 @@ def test_publish_namespace_done_encode_decode():
         status_code=0,
         reason_phrase="Done",
     )
-    encoded = msg.encode()
-    decoded, consumed = decode_control_message(encoded)
-    assert isinstance(decoded, PublishNamespaceDone)
+    decoded = _roundtrip(msg, PublishNamespaceDone)
     assert decoded.request_id == 60
     assert decoded.status_code == 0
     assert decoded.reason_phrase == "Done"
@@ -548,9 +515,7 @@ def test_publish_namespace_done_encode_decode():
 def test_publish_namespace_cancel_encode_decode():
     """エンコード/デコード"""
     msg = PublishNamespaceCancel(request_id=60)
-    encoded = msg.encode()
-    decoded, consumed = decode_control_message(encoded)
-    assert isinstance(decoded, PublishNamespaceCancel)
+    decoded = _roundtrip(msg, PublishNamespaceCancel)
     assert decoded.request_id == 60
 
 
@@ -563,9 +528,7 @@ def test_subscribe_namespace_encode_decode():
         request_id=70,
         track_namespace_prefix=TrackNamespace(tuple=[b"media"]),
     )
-    encoded = msg.encode()
-    decoded, consumed = decode_control_message(encoded)
-    assert isinstance(decoded, SubscribeNamespace)
+    decoded = _roundtrip(msg, SubscribeNamespace)
     assert decoded.request_id == 70
     assert decoded.track_namespace_prefix.tuple == [b"media"]
 
@@ -576,9 +539,7 @@ def test_subscribe_namespace_encode_decode():
 def test_unsubscribe_namespace_encode_decode():
     """エンコード/デコード"""
     msg = UnsubscribeNamespace(request_id=70)
-    encoded = msg.encode()
-    decoded, consumed = decode_control_message(encoded)
-    assert isinstance(decoded, UnsubscribeNamespace)
+    decoded = _roundtrip(msg, UnsubscribeNamespace)
     assert decoded.request_id == 70
 
 
@@ -588,9 +549,7 @@ def test_unsubscribe_namespace_encode_decode():
 def test_subscribe_update_encode_decode():
     """エンコード/デコード"""
     msg = SubscribeUpdate(request_id=80)
-    encoded = msg.encode()
-    decoded, consumed = decode_control_message(encoded)
-    assert isinstance(decoded, SubscribeUpdate)
+    decoded = _roundtrip(msg, SubscribeUpdate)
     assert decoded.request_id == 80
 
 
@@ -600,12 +559,24 @@ def test_subscribe_update_encode_decode():
 def test_requests_blocked_encode_decode():
     """エンコード/デコード"""
     msg = RequestsBlocked(maximum_request_id=999)
-    encoded = msg.encode()
-    decoded, consumed = decode_control_message(encoded)
-    assert isinstance(decoded, RequestsBlocked)
+    decoded = _roundtrip(msg, RequestsBlocked)
     assert decoded.maximum_request_id == 999
 
 
+# decode_control_message のテスト
+
+
+@pytest.mark.parametrize("buffer_type", [bytearray, memoryview])
+def test_decode_control_message_buffer(buffer_type):
+    """受信バッファの bytearray / memoryview からのデコード"""
+    msg = RequestError(request_id=42, error_code=1, reason_phrase="Test error")
+    encoded = msg.encode()
+    decoded, consumed = decode_control_message(buffer_type(encoded + b"\x00"))
+    assert isinstance(decoded, RequestError)
+    assert decoded.reason_phrase == "Test error"
+    assert consumed == len(encoded)
+
+
 # MoqtSession のテスト
 
 
@@ -669,12 +640,3 @@ def test_moqt_session_track_info():
     assert info.track_alias == 1
     assert info.subscription_filter is None
     assert info.group_order is None
-
-
-# GroupOrder のテスト
-
-
-def test_group_order_values():
-    """グループ順序の値を確認"""
-    assert GroupOrder.ASCENDING == 0x01
-    assert GroupOrder.DESCENDING == 0x02
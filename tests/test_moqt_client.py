@@ -4,7 +4,7 @@ msquic-py の MOQT クライアントから aioquic の MOQT サーバーへ接
 """
 
 import asyncio
-import threading
+import io
 
 import pytest
 import pytest_asyncio
@@ -25,6 +25,10 @@ from moqt import (
 from conftest import get_free_port
 
 
+# 制御ストリームの先頭に送る Stream Type の varint
+CONTROL_STREAM_TYPE = encode_varint(StreamType.CONTROL)
+
+
 class MoqtServerProtocol(QuicConnectionProtocol):
     """aioquic MOQT サーバー用プロトコル"""
 
@@ -60,7 +64,7 @@ class MoqtServerProtocol(QuicConnectionProtocol):
         """受信バッファからメッセージを処理"""
         while len(self.receive_buffer) > 0:
             try:
-                message, consumed = decode_control_message(bytes(self.receive_buffer))
+                message, consumed = decode_control_message(self.receive_buffer)
                 del self.receive_buffer[:consumed]
 
                 if isinstance(message, ClientSetup):
@@ -121,78 +125,69 @@ async def moqt_aioquic_server(certificates):
 @pytest.mark.asyncio
 async def test_moqt_client_setup(moqt_aioquic_server):
     """MOQT クライアントの Setup テスト"""
-    connected_event = threading.Event()
-    shutdown_event = threading.Event()
-    received_data: list[bytes] = []
-    receive_event = threading.Event()
-
-    def run_client():
-        """別スレッドで msquic クライアントを実行"""
-        # Registration 作成
-        reg = msquic.Registration("moqt_client", msquic.ExecutionProfile.LOW_LATENCY)
-
-        # Configuration 作成
-        config = msquic.Configuration(
-            reg,
-            moqt_aioquic_server["alpn"],
-            idle_timeout_ms=5000,
-            peer_bidi_stream_count=100,
-        )
-        config.load_credential_none(no_certificate_validation=True)
-
-        # Connection 作成
-        conn = msquic.Connection(reg)
+    # msquic のコールバックはワーカースレッドで呼ばれるので、
+    # call_soon_threadsafe でイベントループ上の asyncio.Event を設定する
+    loop = asyncio.get_running_loop()
+    connected_event = asyncio.Event()
+    receive_event = asyncio.Event()
+    shutdown_event = asyncio.Event()
+    received_data = io.BytesIO()
+
+    # Registration 作成
+    reg = msquic.Registration("moqt_client", msquic.ExecutionProfile.LOW_LATENCY)
+
+    # Configuration 作成
+    config = msquic.Configuration(
+        reg,
+        moqt_aioquic_server["alpn"],
+        idle_timeout_ms=5000,
+        peer_bidi_stream_count=100,
+    )
+    config.load_credential_none(no_certificate_validation=True)
 
-        def on_connected(_session_resumed):
-            connected_event.set()
+    # Connection 作成
+    conn = msquic.Connection(reg)
 
-        def on_shutdown_complete(_app_close_in_progress):
-            shutdown_event.set()
+    def on_connected(_session_resumed):
+        loop.call_soon_threadsafe(connected_event.set)
 
-        conn.set_on_connected(on_connected)
-        conn.set_on_shutdown_complete(on_shutdown_complete)
+    def on_shutdown_complete(_app_close_in_progress):
+        loop.call_soon_threadsafe(shutdown_event.set)
 
-        # 接続開始
-        conn.start(config, moqt_aioquic_server["host"], moqt_aioquic_server["port"])
+    conn.set_on_connected(on_connected)
+    conn.set_on_shutdown_complete(on_shutdown_complete)
 
-        # 接続完了を待機
-        if not connected_event.wait(timeout=5.0):
-            return False
+    # 接続開始
+    conn.start(config, moqt_aioquic_server["host"], moqt_aioquic_server["port"])
 
-        # 制御ストリームを開く
-        stream = conn.open_stream(msquic.StreamOpenFlags.NONE)
-        stream.start(msquic.StreamStartFlags.IMMEDIATE)
+    # 接続完了を待機
+    await asyncio.wait_for(connected_event.wait(), timeout=5.0)
 
-        def on_receive(data, _fin):
-            received_data.append(bytes(data))
-            if len(b"".join(received_data)) > 0:
-                receive_event.set()
+    # 制御ストリームを開く
+    stream = conn.open_stream(msquic.StreamOpenFlags.NONE)
+    stream.start(msquic.StreamStartFlags.IMMEDIATE)
 
-        stream.set_on_receive(on_receive)
+    def on_receive(data, _fin):
+        if len(data) > 0:
+            received_data.write(data)
+            loop.call_soon_threadsafe(receive_event.set)
 
-        # Stream Type + CLIENT_SETUP を送信
-        stream_type = encode_varint(StreamType.CONTROL)
-        client_setup = ClientSetup()
-        client_setup.set_max_request_id(100)
-        client_setup.set_path("/moqt")
+    stream.set_on_receive(on_receive)
 
-        stream.send(stream_type + client_setup.encode(), msquic.SendFlags.NONE)
+    # Stream Type + CLIENT_SETUP を送信
+    client_setup = ClientSetup()
+    client_setup.set_max_request_id(100)
+    client_setup.set_path("/moqt")
 
-        # SERVER_SETUP を待機
-        if not receive_event.wait(timeout=5.0):
-            conn.shutdown(msquic.ConnectionShutdownFlags.NONE, 0)
-            return False
+    stream.send(CONTROL_STREAM_TYPE + client_setup.encode(), msquic.SendFlags.NONE)
 
-        # クリーンアップ
-        conn.shutdown(msquic.ConnectionShutdownFlags.NONE, 0)
-        shutdown_event.wait(timeout=5.0)
-        return True
+    # SERVER_SETUP を待機
+    await asyncio.wait_for(receive_event.wait(), timeout=5.0)
 
-    # クライアントを別スレッドで実行
-    result = await asyncio.to_thread(run_client)
-    assert result, "Client failed"
+    # クリーンアップ
+    conn.shutdown(msquic.ConnectionShutdownFlags.NONE, 0)
+    await asyncio.wait_for(shutdown_event.wait(), timeout=5.0)
 
     # SERVER_SETUP をデコード
-    response_data = b"".join(received_data)
-    server_setup, _ = decode_control_message(response_data)
+    server_setup, _ = decode_control_message(received_data.getvalue())
     assert isinstance(server_setup, ServerSetup)
@@ -8,7 +8,6 @@ import asyncio
 import pytest
 from aioquic.asyncio import connect
 from aioquic.asyncio.protocol import QuicConnectionProtocol
-from aioquic.quic.configuration import QuicConfiguration
 from aioquic.quic.events import HandshakeCompleted, StreamDataReceived
 
 import msquic
@@ -20,7 +19,23 @@ from moqt import (
     encode_varint,
 )
 
-from conftest import get_free_port
+from conftest import get_aioquic_client_configuration
+
+
+# 制御ストリームの先頭に送る Stream Type の varint
+CONTROL_STREAM_TYPE = encode_varint(StreamType.CONTROL)
+
+
+def _encode_client_setup_frame() -> bytes:
+    """制御ストリームの先頭に送る Stream Type + CLIENT_SETUP をエンコードする"""
+    setup = ClientSetup()
+    setup.set_max_request_id(100)
+    setup.set_path("/moqt")
+    return CONTROL_STREAM_TYPE + setup.encode()
+
+
+# どのクライアントも同じ内容を送るので、1 度だけエンコードして使い回す
+CLIENT_SETUP_FRAME = _encode_client_setup_frame()
 
 
 class MoqtClientProtocol(QuicConnectionProtocol):
@@ -49,7 +64,7 @@ class MoqtClientProtocol(QuicConnectionProtocol):
         """受信バッファからメッセージを処理"""
         while len(self.receive_buffer) > 0:
             try:
-                message, consumed = decode_control_message(bytes(self.receive_buffer))
+                message, consumed = decode_control_message(self.receive_buffer)
                 del self.receive_buffer[:consumed]
 
                 if isinstance(message, ServerSetup):
@@ -63,25 +78,14 @@ class MoqtClientProtocol(QuicConnectionProtocol):
         # 制御ストリームを開く
         self.control_stream_id = self._quic.get_next_available_stream_id()
 
-        # Stream Type を送信
-        stream_type = encode_varint(StreamType.CONTROL)
-
-        # CLIENT_SETUP を送信
-        setup = ClientSetup()
-        setup.set_max_request_id(100)
-        setup.set_path("/moqt")
-
-        self._quic.send_stream_data(
-            self.control_stream_id, stream_type + setup.encode(), end_stream=False
-        )
+        # Stream Type + CLIENT_SETUP を送信
+        self._quic.send_stream_data(self.control_stream_id, CLIENT_SETUP_FRAME, end_stream=False)
         self.transmit()
 
 
 @pytest.fixture
 def moqt_msquic_server(certificates):
     """msquic MOQT サーバーを起動するフィクスチャ"""
-    port = get_free_port()
-
     # Registration 作成
     reg = msquic.Registration("moqt_server", msquic.ExecutionProfile.LOW_LATENCY)
 
@@ -110,7 +114,8 @@ def moqt_msquic_server(certificates):
 
             def on_receive(data, fin):
                 nonlocal receive_buffer
-                data_bytes = bytes(data)
+                # Stream Type を取り除くときにコピーしないよう memoryview で扱う
+                data_bytes = memoryview(data)
 
                 # 最初のバイトは Stream Type
                 if not stream_type_received[0]:
@@ -125,7 +130,7 @@ def moqt_msquic_server(certificates):
                 # メッセージを処理
                 while len(receive_buffer) > 0:
                     try:
-                        message, consumed = decode_control_message(bytes(receive_buffer))
+                        message, consumed = decode_control_message(receive_buffer)
                         del receive_buffer[:consumed]
 
                         if isinstance(message, ClientSetup):
@@ -141,7 +146,9 @@ def moqt_msquic_server(certificates):
         conn.set_on_peer_stream_started(on_peer_stream_started)
 
     listener.set_on_new_connection(on_new_connection)
-    listener.start(config, ["moqt-15"], port)
+    # ポートに 0 を指定して OS に割り当てさせ、実際のポートを Listener から取得する
+    listener.start(config, ["moqt-15"], 0)
+    port = listener.local_port
 
     yield {
         "host": "127.0.0.1",
@@ -156,11 +163,7 @@ def moqt_msquic_server(certificates):
 @pytest.mark.asyncio
 async def test_aioquic_moqt_client_setup(moqt_msquic_server):
     """aioquic MOQT クライアントから msquic サーバーへの Setup テスト"""
-    configuration = QuicConfiguration(
-        is_client=True,
-        alpn_protocols=moqt_msquic_server["alpn"],
-    )
-    configuration.verify_mode = False
+    configuration = get_aioquic_client_configuration(moqt_msquic_server["alpn"])
 
     async with connect(
         moqt_msquic_server["host"],
@@ -184,11 +187,7 @@ async def test_aioquic_moqt_client_setup(moqt_msquic_server):
 @pytest.mark.asyncio
 async def test_multiple_moqt_clients(moqt_msquic_server):
     """複数の MOQT クライアントからの接続テスト"""
-    configuration = QuicConfiguration(
-        is_client=True,
-        alpn_protocols=moqt_msquic_server["alpn"],
-    )
-    configuration.verify_mode = False
+    configuration = get_aioquic_client_configuration(moqt_msquic_server["alpn"])
 
     num_clients = 3
 
@@ -3,30 +3,26 @@
 aioquic で起動した QUIC サーバーに msquic-py クライアントから接続するテスト
 """
 
+import queue
 import threading
+import time
+
+import pytest
+from conftest import remaining_time
 
 import msquic
 
 
-def test_connect_to_server(quic_server):
+def test_connect_to_server(quic_server, msquic_client_registration, msquic_client_configuration):
     """サーバーへの接続テスト"""
     connected_event = threading.Event()
     shutdown_event = threading.Event()
 
-    # Registration 作成
-    reg = msquic.Registration("test_client", msquic.ExecutionProfile.LOW_LATENCY)
-
-    # Configuration 作成 (ALPN: echo)
-    config = msquic.Configuration(
-        reg,
-        quic_server["alpn"],
-        idle_timeout_ms=5000,
-    )
-    # クライアント証明書なし、サーバー証明書検証なし
-    config.load_credential_none(no_certificate_validation=True)
+    # Registration と Configuration はセッション全体で共有する
+    config = msquic_client_configuration(quic_server["alpn"])
 
     # Connection 作成
-    conn = msquic.Connection(reg)
+    conn = msquic.Connection(msquic_client_registration)
 
     def on_connected(_session_resumed):
         connected_event.set()
@@ -48,26 +44,18 @@ def test_connect_to_server(quic_server):
     assert shutdown_event.wait(timeout=5.0), "Shutdown timeout"
 
 
-def test_echo_stream(quic_server):
+def test_echo_stream(quic_server, msquic_client_registration, msquic_client_configuration):
     """Echo ストリームのテスト"""
     connected_event = threading.Event()
     received_event = threading.Event()
     shutdown_event = threading.Event()
     received_data = []
 
-    # Registration 作成
-    reg = msquic.Registration("test_client", msquic.ExecutionProfile.LOW_LATENCY)
-
-    # Configuration 作成
-    config = msquic.Configuration(
-        reg,
-        quic_server["alpn"],
-        idle_timeout_ms=5000,
-    )
-    config.load_credential_none(no_certificate_validation=True)
+    # Registration と Configuration はセッション全体で共有する
+    config = msquic_client_configuration(quic_server["alpn"])
 
     # Connection 作成
-    conn = msquic.Connection(reg)
+    conn = msquic.Connection(msquic_client_registration)
 
     def on_connected(_session_resumed):
         connected_event.set()
@@ -88,7 +76,7 @@ def test_echo_stream(quic_server):
     stream = conn.open_stream(msquic.StreamOpenFlags.NONE)
 
     def on_receive(data, fin):
-        received_data.append(bytes(data))
+        received_data.append(data)
         if fin:
             received_event.set()
 
@@ -112,28 +100,23 @@ def test_echo_stream(quic_server):
     assert shutdown_event.wait(timeout=5.0), "Shutdown timeout"
 
 
-def test_multiple_streams(quic_server):
+def test_multiple_streams(quic_server, msquic_client_registration, msquic_client_configuration):
     """複数ストリームのテスト"""
     connected_event = threading.Event()
     shutdown_event = threading.Event()
+    # 全ストリームの受信を (ストリーム番号, データ, FIN) として 1 つのキューに集める
+    received_queue: queue.SimpleQueue[tuple[int, bytes, bool]] = queue.SimpleQueue()
     stream_results = {}
-    stream_events = {}
 
     num_streams = 3
+    # 各ストリームで送信するメッセージは事前にエンコードしておく
+    messages = [f"Stream {i} message".encode() for i in range(num_streams)]
 
-    # Registration 作成
-    reg = msquic.Registration("test_client", msquic.ExecutionProfile.LOW_LATENCY)
-
-    # Configuration 作成
-    config = msquic.Configuration(
-        reg,
-        quic_server["alpn"],
-        idle_timeout_ms=5000,
-    )
-    config.load_credential_none(no_certificate_validation=True)
+    # Registration と Configuration はセッション全体で共有する
+    config = msquic_client_configuration(quic_server["alpn"])
 
     # Connection 作成
-    conn = msquic.Connection(reg)
+    conn = msquic.Connection(msquic_client_registration)
 
     def on_connected(_session_resumed):
         connected_event.set()
@@ -151,16 +134,13 @@ def test_multiple_streams(quic_server):
     # 複数ストリームを開く
     for i in range(num_streams):
         stream_id = i
-        stream_results[stream_id] = []
-        stream_events[stream_id] = threading.Event()
+        stream_results[stream_id] = bytearray()
 
         stream = conn.open_stream(msquic.StreamOpenFlags.NONE)
 
         def make_on_receive(sid):
             def on_receive(data, fin):
-                stream_results[sid].append(bytes(data))
-                if fin:
-                    stream_events[sid].set()
+                received_queue.put((sid, data, fin))
 
             return on_receive
 
@@ -168,14 +148,22 @@ def test_multiple_streams(quic_server):
         stream.start(msquic.StreamStartFlags.IMMEDIATE)
 
         # 各ストリームで異なるメッセージを送信
-        message = f"Stream {i} message".encode()
-        stream.send(message, msquic.SendFlags.FIN)
+        stream.send(messages[i], msquic.SendFlags.FIN)
 
     # すべてのストリームの応答を待機
+    pending_streams = set(stream_results)
+    deadline = time.monotonic() + 5.0
+    while pending_streams:
+        try:
+            sid, data, fin = received_queue.get(timeout=remaining_time(deadline))
+        except queue.Empty:
+            pytest.fail(f"Stream {sorted(pending_streams)} timeout")
+        stream_results[sid].extend(data)
+        if fin:
+            pending_streams.discard(sid)
+
     for i in range(num_streams):
-        assert stream_events[i].wait(timeout=5.0), f"Stream {i} timeout"
-        expected = f"Stream {i} message".encode()
-        assert b"".join(stream_results[i]) == expected
+        assert stream_results[i] == messages[i]
 
     # クリーンアップ
     conn.shutdown(msquic.ConnectionShutdownFlags.NONE, 0)
@@ -8,12 +8,18 @@ import asyncio
 import pytest
 from aioquic.asyncio import connect
 from aioquic.asyncio.protocol import QuicConnectionProtocol
-from aioquic.quic.configuration import QuicConfiguration
 from aioquic.quic.events import HandshakeCompleted, StreamDataReceived
 
 import msquic
 
-from conftest import get_free_port
+from conftest import get_aioquic_client_configuration
+
+
+# msquic Echo サーバーが受信データをまとめて送り返すサイズ
+ECHO_SEND_THRESHOLD = 16384
+
+# test_large_data_echo で送信する 64 KiB のデータ
+LARGE_PAYLOAD = b"X" * 65536
 
 
 def create_echo_client_protocol(*args, **kwargs):
@@ -27,23 +33,30 @@ class EchoClientProtocol(QuicConnectionProtocol):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.received_data = []
+        self.received_data = bytearray()
         self.received_event = asyncio.Event()
 
     def quic_event_received(self, event):
         if isinstance(event, HandshakeCompleted):
             pass
         elif isinstance(event, StreamDataReceived):
-            self.received_data.append(event.data)
+            self.received_data.extend(event.data)
             if event.end_stream:
                 self.received_event.set()
 
+    def reset(self):
+        """次のストリームの受信に備えて受信データとイベントをクリアする"""
+        self.received_data.clear()
+        self.received_event.clear()
+
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def msquic_server(certificates):
-    """msquic Echo サーバーを起動するフィクスチャ"""
-    port = get_free_port()
+    """msquic Echo サーバーを起動するフィクスチャ
 
+    Registration / Configuration / Listener の作成と証明書の読み込みは
+    モジュール内のテストで 1 度だけ行う
+    """
     # Registration 作成
     reg = msquic.Registration("test_server", msquic.ExecutionProfile.LOW_LATENCY)
 
@@ -67,19 +80,26 @@ def msquic_server(certificates):
         connections.append(conn)
 
         def on_peer_stream_started(stream):
+            # 受信したチャンクごとに送信せず、まとめてからエコーバックする
+            pending = bytearray()
+
             def on_receive(data, fin):
-                # エコーバック
+                pending.extend(data)
                 if fin:
-                    stream.send(bytes(data), msquic.SendFlags.FIN)
-                else:
-                    stream.send(bytes(data), msquic.SendFlags.NONE)
+                    stream.send(bytes(pending), msquic.SendFlags.FIN)
+                    pending.clear()
+                elif len(pending) >= ECHO_SEND_THRESHOLD:
+                    stream.send(bytes(pending), msquic.SendFlags.NONE)
+                    pending.clear()
 
             stream.set_on_receive(on_receive)
 
         conn.set_on_peer_stream_started(on_peer_stream_started)
 
     listener.set_on_new_connection(on_new_connection)
-    listener.start(config, ["echo"], port)
+    # ポートに 0 を指定して OS に割り当てさせ、実際のポートを Listener から取得する
+    listener.start(config, ["echo"], 0)
+    port = listener.local_port
 
     yield {
         "host": "127.0.0.1",
@@ -94,15 +114,17 @@ def msquic_server(certificates):
     # listener.stop() はデストラクタで自動的に呼ばれる
 
 
+@pytest.fixture(autouse=True)
+def clear_msquic_server_connections(msquic_server):
+    """テストごとに msquic サーバーが受け付けた Connection を解放する"""
+    yield
+    msquic_server["connections"].clear()
+
+
 @pytest.mark.asyncio
 async def test_aioquic_connect_to_msquic_server(msquic_server):
     """aioquic クライアントから msquic サーバーへの接続テスト"""
-    configuration = QuicConfiguration(
-        is_client=True,
-        alpn_protocols=msquic_server["alpn"],
-    )
-    # サーバー証明書の検証をスキップ
-    configuration.verify_mode = False
+    configuration = get_aioquic_client_configuration(msquic_server["alpn"])
 
     async with connect(
         msquic_server["host"],
@@ -118,11 +140,7 @@ async def test_aioquic_connect_to_msquic_server(msquic_server):
 @pytest.mark.asyncio
 async def test_aioquic_echo_to_msquic_server(msquic_server):
     """aioquic クライアントから msquic サーバーへの Echo テスト"""
-    configuration = QuicConfiguration(
-        is_client=True,
-        alpn_protocols=msquic_server["alpn"],
-    )
-    configuration.verify_mode = False
+    configuration = get_aioquic_client_configuration(msquic_server["alpn"])
 
     async with connect(
         msquic_server["host"],
@@ -146,18 +164,14 @@ async def test_aioquic_echo_to_msquic_server(msquic_server):
             pytest.fail("Echo response timeout")
 
         # 受信データを検証
-        received = b"".join(protocol.received_data)
+        received = protocol.received_data
         assert received == test_message
 
 
 @pytest.mark.asyncio
 async def test_aioquic_multiple_streams_to_msquic_server(msquic_server):
     """aioquic クライアントから msquic サーバーへの複数ストリームテスト"""
-    configuration = QuicConfiguration(
-        is_client=True,
-        alpn_protocols=msquic_server["alpn"],
-    )
-    configuration.verify_mode = False
+    configuration = get_aioquic_client_configuration(msquic_server["alpn"])
 
     async with connect(
         msquic_server["host"],
@@ -199,9 +213,7 @@ class MultiStreamClientProtocol(QuicConnectionProtocol):
 
     def quic_event_received(self, event):
         if isinstance(event, StreamDataReceived):
-            if event.stream_id not in self.stream_data:
-                self.stream_data[event.stream_id] = b""
-            self.stream_data[event.stream_id] += event.data
+            self.stream_data.setdefault(event.stream_id, bytearray()).extend(event.data)
             if event.end_stream:
                 self.completed_streams.add(event.stream_id)
                 if len(self.completed_streams) >= self.expected_streams:
@@ -211,11 +223,7 @@ class MultiStreamClientProtocol(QuicConnectionProtocol):
 @pytest.mark.asyncio
 async def test_large_data_echo(msquic_server):
     """大量のデータ送受信テスト"""
-    configuration = QuicConfiguration(
-        is_client=True,
-        alpn_protocols=msquic_server["alpn"],
-    )
-    configuration.verify_mode = False
+    configuration = get_aioquic_client_configuration(msquic_server["alpn"])
 
     async with connect(
         msquic_server["host"],
@@ -226,26 +234,22 @@ async def test_large_data_echo(msquic_server):
         await protocol.wait_connected()
 
         # 64KB のデータを送信
-        large_data = b"X" * 65536
         stream_id = protocol._quic.get_next_available_stream_id()
-        protocol._quic.send_stream_data(stream_id, large_data, end_stream=True)
+        protocol._quic.send_stream_data(stream_id, LARGE_PAYLOAD, end_stream=True)
         protocol.transmit()
 
         await asyncio.wait_for(protocol.received_event.wait(), timeout=5.0)
 
-        received = b"".join(protocol.received_data)
-        assert len(received) == len(large_data)
-        assert received == large_data
+        # received_data は bytearray なので結合せずにそのまま比較できる
+        received = protocol.received_data
+        assert len(received) == len(LARGE_PAYLOAD)
+        assert received == LARGE_PAYLOAD
 
 
 @pytest.mark.asyncio
 async def test_multiple_concurrent_clients(msquic_server):
     """複数クライアントからの同時接続テスト"""
-    configuration = QuicConfiguration(
-        is_client=True,
-        alpn_protocols=msquic_server["alpn"],
-    )
-    configuration.verify_mode = False
+    configuration = get_aioquic_client_configuration(msquic_server["alpn"])
 
     num_clients = 5
 
@@ -265,7 +269,7 @@ async def test_multiple_concurrent_clients(msquic_server):
 
             await asyncio.wait_for(protocol.received_event.wait(), timeout=5.0)
 
-            received = b"".join(protocol.received_data)
+            received = protocol.received_data
             assert received == message
             return client_id
 
@@ -278,13 +282,11 @@ async def test_multiple_concurrent_clients(msquic_server):
 @pytest.mark.asyncio
 async def test_many_streams_single_connection(msquic_server):
     """単一接続で多数のストリームを使用するテスト"""
-    configuration = QuicConfiguration(
-        is_client=True,
-        alpn_protocols=msquic_server["alpn"],
-    )
-    configuration.verify_mode = False
+    configuration = get_aioquic_client_configuration(msquic_server["alpn"])
 
     num_streams = 20
+    # 各ストリームで送信するメッセージは接続前にエンコードしておく
+    stream_messages = [f"Stream {i} data".encode() for i in range(num_streams)]
 
     async with connect(
         msquic_server["host"],
@@ -295,10 +297,10 @@ async def test_many_streams_single_connection(msquic_server):
         await protocol.wait_connected()
         protocol.expected_streams = num_streams
 
+        # 全ストリームのデータを積んでから 1 度だけ transmit する
         messages = {}
-        for i in range(num_streams):
+        for message in stream_messages:
             stream_id = protocol._quic.get_next_available_stream_id()
-            message = f"Stream {i} data".encode()
             messages[stream_id] = message
             protocol._quic.send_stream_data(stream_id, message, end_stream=True)
 
@@ -315,11 +317,7 @@ async def test_many_streams_single_connection(msquic_server):
 @pytest.mark.asyncio
 async def test_sequential_streams(msquic_server):
     """ストリームを順次開閉するテスト"""
-    configuration = QuicConfiguration(
-        is_client=True,
-        alpn_protocols=msquic_server["alpn"],
-    )
-    configuration.verify_mode = False
+    configuration = get_aioquic_client_configuration(msquic_server["alpn"])
 
     async with connect(
         msquic_server["host"],
@@ -331,8 +329,7 @@ async def test_sequential_streams(msquic_server):
 
         for i in range(5):
             # 各イテレーションで新しいストリームを使用
-            protocol.received_data = []
-            protocol.received_event = asyncio.Event()
+            protocol.reset()
 
             message = f"Sequential message {i}".encode()
             stream_id = protocol._quic.get_next_available_stream_id()
@@ -341,18 +338,14 @@ async def test_sequential_streams(msquic_server):
 
             await asyncio.wait_for(protocol.received_event.wait(), timeout=5.0)
 
-            received = b"".join(protocol.received_data)
+            received = protocol.received_data
             assert received == message
 
 
 @pytest.mark.asyncio
 async def test_rapid_connect_disconnect(msquic_server):
     """高速な接続・切断の繰り返しテスト"""
-    configuration = QuicConfiguration(
-        is_client=True,
-        alpn_protocols=msquic_server["alpn"],
-    )
-    configuration.verify_mode = False
+    configuration = get_aioquic_client_configuration(msquic_server["alpn"])
 
     for i in range(10):
         async with connect(
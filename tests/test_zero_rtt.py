@@ -3,251 +3,112 @@
 msquic の 0-RTT Resumption 機能をテストする
 """
 
-import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from enum import IntFlag, auto
 
-import msquic
-
-from conftest import get_free_port
-
-
-def test_resumption_ticket_received(certificates):
-    """Resumption Ticket 受信テスト
-
-    サーバーが send_resumption_ticket() を呼んだ後、
-    クライアントが RESUMPTION_TICKET_RECEIVED イベントを受信することを確認する。
-    """
-    port = get_free_port()
-    server_connected_event = threading.Event()
-    client_connected_event = threading.Event()
-    client_shutdown_event = threading.Event()
-    server_shutdown_event = threading.Event()
-    ticket_received_event = threading.Event()
-    received_ticket = []
-
-    # サーバー側 (RESUME_AND_ZERORTT を設定)
-    server_reg = msquic.Registration("zero_rtt_server", msquic.ExecutionProfile.LOW_LATENCY)
-    server_config = msquic.Configuration(
-        server_reg,
-        ["zero-rtt-test"],
-        idle_timeout_ms=5000,
-        peer_bidi_stream_count=10,
-        server_resumption_level=msquic.ServerResumptionLevel.RESUME_AND_ZERORTT,
-    )
-    server_config.load_credential_file(
-        certificates["cert_file"],
-        certificates["key_file"],
-    )
-
-    listener = msquic.Listener(server_reg)
-    server_connections = []
-
-    def on_new_connection(server_conn):
-        server_connections.append(server_conn)
-
-        def on_server_connected(_session_resumed):
-            # サーバー側で Resumption Ticket を送信
-            server_conn.send_resumption_ticket()
-            server_connected_event.set()
-
-        def on_server_shutdown_complete(_app_close_in_progress):
-            server_shutdown_event.set()
-
-        server_conn.set_on_connected(on_server_connected)
-        server_conn.set_on_shutdown_complete(on_server_shutdown_complete)
-
-    listener.set_on_new_connection(on_new_connection)
-    listener.start(server_config, ["zero-rtt-test"], port)
+import pytest
 
-    # クライアント側
-    client_reg = msquic.Registration("zero_rtt_client", msquic.ExecutionProfile.LOW_LATENCY)
-    client_config = msquic.Configuration(
-        client_reg,
-        ["zero-rtt-test"],
-        idle_timeout_ms=5000,
-    )
-    client_config.load_credential_none(no_certificate_validation=True)
-
-    conn = msquic.Connection(client_reg)
-
-    def on_connected(_session_resumed):
-        client_connected_event.set()
+import msquic
 
-    def on_shutdown_complete(_app_close_in_progress):
-        client_shutdown_event.set()
+from conftest import EventState, remaining_time
 
-    def on_resumption_ticket_received(ticket):
-        received_ticket.append(bytes(ticket))
-        ticket_received_event.set()
+# pytest-xdist で並列実行する場合も 0-RTT のテストは同じワーカーで実行し、
+# モジュールスコープのサーバーとフルハンドシェイクをワーカーごとに作り直さない
+pytestmark = pytest.mark.xdist_group("zero_rtt")
 
-    conn.set_on_connected(on_connected)
-    conn.set_on_shutdown_complete(on_shutdown_complete)
-    conn.set_on_resumption_ticket_received(on_resumption_ticket_received)
+# サーバーとクライアントの Configuration、Listener で共有する ALPN
+ZERO_RTT_ALPN = ["zero-rtt-test"]
 
-    # 接続開始
-    conn.start(client_config, "127.0.0.1", port)
+# 1 つのテスト (フィクスチャ) 内のすべての待機に対する制限時間 (秒)
+_WAIT_DEADLINE = 10.0
 
-    # 接続完了を待機
-    assert client_connected_event.wait(timeout=5.0), "Client connection timeout"
-    assert server_connected_event.wait(timeout=5.0), "Server connection timeout"
 
-    # Resumption Ticket を待機
-    assert ticket_received_event.wait(timeout=5.0), "Ticket receive timeout"
-    assert len(received_ticket) == 1
-    assert len(received_ticket[0]) > 0, "Ticket should not be empty"
+class _ZeroRttEvent(IntFlag):
+    """0-RTT テストで待機するイベント"""
 
-    # クリーンアップ
-    conn.shutdown(msquic.ConnectionShutdownFlags.NONE, 0)
-    assert client_shutdown_event.wait(timeout=5.0), "Client shutdown timeout"
-    assert server_shutdown_event.wait(timeout=5.0), "Server shutdown timeout"
-    listener.close()
+    SERVER_CONNECTED = auto()
+    SERVER_SHUTDOWN = auto()
+    SERVER_DATA_RECEIVED = auto()
 
 
-def test_session_resumption(certificates):
-    """セッション再開テスト
+@dataclass(slots=True)
+class _ServerConnState:
+    """zero_rtt_server が受け付けた接続の状態
 
-    1. 最初の接続で Resumption Ticket を取得
-    2. 2回目の接続で Ticket を使用してセッションを再開
-    注意: これは Session Resumption のテストであり、0-RTT データ送信のテストではない
+    サーバー側の接続のコールバックはこのクラスのメソッドで受け取る
     """
-    port = get_free_port()
-    received_ticket = []
 
-    # サーバー側
-    server_reg = msquic.Registration("zero_rtt_server", msquic.ExecutionProfile.LOW_LATENCY)
-    server_config = msquic.Configuration(
-        server_reg,
-        ["zero-rtt-test"],
-        idle_timeout_ms=5000,
-        peer_bidi_stream_count=10,
-        server_resumption_level=msquic.ServerResumptionLevel.RESUME_AND_ZERORTT,
-    )
-    server_config.load_credential_file(
-        certificates["cert_file"],
-        certificates["key_file"],
-    )
-
-    listener = msquic.Listener(server_reg)
-    server_connections = []
-    server_session_resumed = []
-    server_connected_events = []
-    server_shutdown_events = []
-
-    def on_new_connection(server_conn):
-        server_connections.append(server_conn)
-        connected_event = threading.Event()
-        shutdown_event = threading.Event()
-        server_connected_events.append(connected_event)
-        server_shutdown_events.append(shutdown_event)
-
-        def on_server_connected(session_resumed):
-            server_session_resumed.append(session_resumed)
-            # Resumption Ticket を送信
-            server_conn.send_resumption_ticket()
-            connected_event.set()
-
-        def on_server_shutdown_complete(_app_close_in_progress):
-            shutdown_event.set()
-
-        server_conn.set_on_connected(on_server_connected)
-        server_conn.set_on_shutdown_complete(on_server_shutdown_complete)
-
-    listener.set_on_new_connection(on_new_connection)
-    listener.start(server_config, ["zero-rtt-test"], port)
-
-    # クライアント側
-    client_reg = msquic.Registration("zero_rtt_client", msquic.ExecutionProfile.LOW_LATENCY)
-    client_config = msquic.Configuration(
-        client_reg,
-        ["zero-rtt-test"],
-        idle_timeout_ms=5000,
-    )
-    client_config.load_credential_none(no_certificate_validation=True)
-
-    # === 最初の接続 (Ticket を取得) ===
-    conn1 = msquic.Connection(client_reg)
-    client_connected_event1 = threading.Event()
-    client_shutdown_event1 = threading.Event()
-    ticket_received_event = threading.Event()
-    client_session_resumed1 = [False]
-
-    def on_connected1(session_resumed):
-        client_session_resumed1[0] = session_resumed
-        client_connected_event1.set()
-
-    def on_shutdown_complete1(_app_close_in_progress):
-        client_shutdown_event1.set()
-
-    def on_resumption_ticket_received(ticket):
-        received_ticket.append(bytes(ticket))
-        ticket_received_event.set()
+    conn: msquic.Connection
+    state: EventState = field(default_factory=EventState)
+    resumed: bool = False
+    received_data: list[bytes] = field(default_factory=list)
 
-    conn1.set_on_connected(on_connected1)
-    conn1.set_on_shutdown_complete(on_shutdown_complete1)
-    conn1.set_on_resumption_ticket_received(on_resumption_ticket_received)
+    def register_callbacks(self) -> None:
+        """conn に接続のコールバックをまとめて登録する"""
+        self.conn.set_on_connected(self.on_connected)
+        self.conn.set_on_shutdown_complete(self.on_shutdown_complete)
+        self.conn.set_on_peer_stream_started(self.on_peer_stream_started)
 
-    conn1.start(client_config, "127.0.0.1", port)
+    def on_connected(self, session_resumed):
+        self.resumed = session_resumed
+        # Resumption Ticket を送信
+        self.conn.send_resumption_ticket()
+        self.state.set(_ZeroRttEvent.SERVER_CONNECTED)
 
-    assert client_connected_event1.wait(timeout=5.0), "First client connection timeout"
-    assert server_connected_events[0].wait(timeout=5.0), "First server connection timeout"
-    assert ticket_received_event.wait(timeout=5.0), "Ticket receive timeout"
-    assert not client_session_resumed1[0], "First connection should not be resumed"
+    def on_shutdown_complete(self, _app_close_in_progress):
+        self.state.set(_ZeroRttEvent.SERVER_SHUTDOWN)
 
-    # 最初の接続を閉じる
-    conn1.shutdown(msquic.ConnectionShutdownFlags.NONE, 0)
-    assert client_shutdown_event1.wait(timeout=5.0), "First client shutdown timeout"
-    assert server_shutdown_events[0].wait(timeout=5.0), "First server shutdown timeout"
+    def on_peer_stream_started(self, stream):
+        stream.set_on_receive(self.on_receive)
 
-    # === 2回目の接続 (Ticket を使用) ===
-    conn2 = msquic.Connection(client_reg)
-    client_connected_event2 = threading.Event()
-    client_shutdown_event2 = threading.Event()
-    client_session_resumed2 = [False]
+    def on_receive(self, data, fin):
+        self.received_data.append(data)
+        if fin:
+            self.state.set(_ZeroRttEvent.SERVER_DATA_RECEIVED)
 
-    def on_connected2(session_resumed):
-        client_session_resumed2[0] = session_resumed
-        client_connected_event2.set()
 
-    def on_shutdown_complete2(_app_close_in_progress):
-        client_shutdown_event2.set()
+@dataclass(slots=True)
+class _ClientPeer:
+    """0-RTT テストのクライアント側の状態
 
-    conn2.set_on_connected(on_connected2)
-    conn2.set_on_shutdown_complete(on_shutdown_complete2)
-
-    # Resumption Ticket を設定
-    conn2.set_resumption_ticket(received_ticket[0])
+    コールバックには束縛メソッドを登録し、接続ごとにクロージャを作らない
+    CONNECTED と Resumption Ticket は 1 度だけ受け取る値なので Future で待機する
+    """
 
-    conn2.start(client_config, "127.0.0.1", port)
+    # CONNECTED で通知されたセッション再開の有無
+    connected: Future[bool] = field(default_factory=Future)
+    ticket: Future[bytes] = field(default_factory=Future)
+    ticket_count: int = 0
 
-    assert client_connected_event2.wait(timeout=5.0), "Second client connection timeout"
-    assert server_connected_events[1].wait(timeout=5.0), "Second server connection timeout"
+    def register_callbacks(self, conn: msquic.Connection) -> None:
+        """conn に接続のコールバックをまとめて登録する"""
+        conn.set_on_connected(self.on_connected)
+        conn.set_on_resumption_ticket_received(self.on_resumption_ticket_received)
 
-    # セッションが再開されたことを確認
-    assert client_session_resumed2[0], "Second connection should be resumed (client)"
-    assert len(server_session_resumed) >= 2, "Server should have 2 connections"
-    assert server_session_resumed[1], "Second connection should be resumed (server)"
+    def on_connected(self, session_resumed):
+        self.connected.set_result(session_resumed)
 
-    # 2回目の接続を閉じる
-    conn2.shutdown(msquic.ConnectionShutdownFlags.NONE, 0)
-    assert client_shutdown_event2.wait(timeout=5.0), "Second client shutdown timeout"
-    assert server_shutdown_events[1].wait(timeout=5.0), "Second server shutdown timeout"
+    def on_resumption_ticket_received(self, ticket):
+        self.ticket_count += 1
+        # 2 つ目以降の Ticket は数えるだけにする
+        if self.ticket_count == 1:
+            self.ticket.set_result(ticket)
 
-    listener.close()
 
+@pytest.fixture(scope="module")
+def zero_rtt_server(certificates):
+    """RESUME_AND_ZERORTT を設定した msquic サーバーを起動するフィクスチャ
 
-def test_zero_rtt_early_data(certificates):
-    """0-RTT 早期データ送信テスト
-
-    真の 0-RTT テスト: CONNECTED イベントを待たずにデータを送信し、
-    サーバーがそのデータを受信できることを確認する。
+    受け付けた接続ごとに Resumption Ticket を送信し、
+    接続の状態 (_ServerConnState) を受け付けた順にリストへ記録する
     """
-    port = get_free_port()
-    received_ticket = []
-
-    # サーバー側
+    # サーバー側 (RESUME_AND_ZERORTT を設定)
     server_reg = msquic.Registration("zero_rtt_server", msquic.ExecutionProfile.LOW_LATENCY)
     server_config = msquic.Configuration(
         server_reg,
-        ["zero-rtt-test"],
+        ZERO_RTT_ALPN,
         idle_timeout_ms=5000,
         peer_bidi_stream_count=10,
         server_resumption_level=msquic.ServerResumptionLevel.RESUME_AND_ZERORTT,
@@ -258,131 +119,165 @@ def test_zero_rtt_early_data(certificates):
     )
 
     listener = msquic.Listener(server_reg)
-    server_connections = []
-    server_connected_events = []
-    server_shutdown_events = []
-    server_received_data = []
-    server_data_received_event = threading.Event()
+    server_connections: list[_ServerConnState] = []
 
     def on_new_connection(server_conn):
-        server_connections.append(server_conn)
-        connected_event = threading.Event()
-        shutdown_event = threading.Event()
-        server_connected_events.append(connected_event)
-        server_shutdown_events.append(shutdown_event)
-
-        def on_server_connected(_session_resumed):
-            server_conn.send_resumption_ticket()
-            connected_event.set()
-
-        def on_server_shutdown_complete(_app_close_in_progress):
-            shutdown_event.set()
-
-        def on_peer_stream_started(stream):
-            def on_receive(data, fin):
-                server_received_data.append(bytes(data))
-                if fin:
-                    server_data_received_event.set()
-
-            stream.set_on_receive(on_receive)
-
-        server_conn.set_on_connected(on_server_connected)
-        server_conn.set_on_shutdown_complete(on_server_shutdown_complete)
-        server_conn.set_on_peer_stream_started(on_peer_stream_started)
+        conn_state = _ServerConnState(server_conn)
+        server_connections.append(conn_state)
+        conn_state.register_callbacks()
 
     listener.set_on_new_connection(on_new_connection)
-    listener.start(server_config, ["zero-rtt-test"], port)
+    # ポートに 0 を指定して OS に割り当てさせ、実際のポートを Listener から取得する
+    listener.start(server_config, ZERO_RTT_ALPN, 0)
+    port = listener.local_port
 
-    # クライアント側
-    client_reg = msquic.Registration("zero_rtt_client", msquic.ExecutionProfile.LOW_LATENCY)
-    client_config = msquic.Configuration(
-        client_reg,
-        ["zero-rtt-test"],
-        idle_timeout_ms=5000,
-    )
-    client_config.load_credential_none(no_certificate_validation=True)
+    yield {
+        "port": port,
+        "listener": listener,
+        "configuration": server_config,
+        "connections": server_connections,
+    }
 
-    # === 最初の接続 (Ticket を取得) ===
-    conn1 = msquic.Connection(client_reg)
-    client_connected_event1 = threading.Event()
-    client_shutdown_event1 = threading.Event()
-    ticket_received_event = threading.Event()
+    listener.close()
 
-    def on_connected1(_session_resumed):
-        client_connected_event1.set()
 
-    def on_shutdown_complete1(_app_close_in_progress):
-        client_shutdown_event1.set()
+@pytest.fixture(autouse=True)
+def clear_zero_rtt_server_connections(zero_rtt_server):
+    """テストごとに zero_rtt_server が受け付けた Connection と記録した状態を解放する
 
-    def on_resumption_ticket_received(ticket):
-        received_ticket.append(bytes(ticket))
-        ticket_received_event.set()
+    サーバーは作り直さずにモジュール内のテストで使い回す
+    """
+    yield
+    zero_rtt_server["connections"].clear()
 
-    conn1.set_on_connected(on_connected1)
-    conn1.set_on_shutdown_complete(on_shutdown_complete1)
-    conn1.set_on_resumption_ticket_received(on_resumption_ticket_received)
 
-    conn1.start(client_config, "127.0.0.1", port)
+@pytest.fixture(scope="module")
+def zero_rtt_client(msquic_client_registration, msquic_client_configuration):
+    """zero_rtt_server に接続するクライアントの Registration / Configuration
 
-    assert client_connected_event1.wait(timeout=5.0), "First client connection timeout"
-    assert server_connected_events[0].wait(timeout=5.0), "First server connection timeout"
-    assert ticket_received_event.wait(timeout=5.0), "Ticket receive timeout"
+    Registration はほかのテストモジュールのクライアントとセッション全体で共有する
+    """
+    return {
+        "registration": msquic_client_registration,
+        "configuration": msquic_client_configuration(ZERO_RTT_ALPN),
+    }
+
+
+def _full_handshake(zero_rtt_server, zero_rtt_client) -> _ClientPeer:
+    """Ticket を使わずに接続し、Resumption Ticket を受信したクライアントの状態を返す"""
+    index = len(zero_rtt_server["connections"])
+    peer = _ClientPeer()
+    deadline = time.monotonic() + _WAIT_DEADLINE
+
+    # with 文を抜けると接続を閉じ、SHUTDOWN_COMPLETE まで待機する
+    with msquic.Connection(zero_rtt_client["registration"]) as conn:
+        peer.register_callbacks(conn)
+
+        conn.start(zero_rtt_client["configuration"], "127.0.0.1", zero_rtt_server["port"])
+
+        session_resumed = peer.connected.result(timeout=remaining_time(deadline))
+        server_conn = zero_rtt_server["connections"][index]
+        assert server_conn.state.wait_until(_ZeroRttEvent.SERVER_CONNECTED, deadline), (
+            "First server connection timeout"
+        )
+        peer.ticket.result(timeout=remaining_time(deadline))
+        assert not session_resumed, "First connection should not be resumed"
+
+    # サーバー側の Connection を解放する前に終了を待機する
+    assert server_conn.state.wait_until(_ZeroRttEvent.SERVER_SHUTDOWN, deadline), (
+        "First server shutdown timeout"
+    )
 
-    conn1.shutdown(msquic.ConnectionShutdownFlags.NONE, 0)
-    assert client_shutdown_event1.wait(timeout=5.0), "First client shutdown timeout"
-    assert server_shutdown_events[0].wait(timeout=5.0), "First server shutdown timeout"
+    return peer
 
-    # サーバーの受信データをリセット
-    server_received_data.clear()
-    server_data_received_event.clear()
 
-    # === 2回目の接続 (0-RTT 早期データ送信) ===
-    conn2 = msquic.Connection(client_reg)
-    client_connected_event2 = threading.Event()
-    client_shutdown_event2 = threading.Event()
-    client_session_resumed = [False]
+@pytest.fixture(scope="module")
+def full_handshake_peer(zero_rtt_server, zero_rtt_client):
+    """モジュール内で 1 度だけ行うフルハンドシェイクのクライアントの状態
 
-    def on_connected2(session_resumed):
-        client_session_resumed[0] = session_resumed
-        client_connected_event2.set()
+    ticket_only はこの接続で Ticket を受信したことを確認し、
+    resume はこの接続で取得した Ticket でセッションを再開する
+    """
+    return _full_handshake(zero_rtt_server, zero_rtt_client)
 
-    def on_shutdown_complete2(_app_close_in_progress):
-        client_shutdown_event2.set()
 
-    conn2.set_on_connected(on_connected2)
-    conn2.set_on_shutdown_complete(on_shutdown_complete2)
+@pytest.fixture
+def early_data_ticket(zero_rtt_server, zero_rtt_client):
+    """0-RTT の早期データを送るための Resumption Ticket
 
-    # Resumption Ticket を設定
-    conn2.set_resumption_ticket(received_ticket[0])
+    サーバーのアンチリプレイにより、一度セッション再開に使った Ticket の早期データは
+    拒否されうるので、resume と共有せずにテストごとに取得する
+    """
+    return _full_handshake(zero_rtt_server, zero_rtt_client).ticket.result()
 
-    # 接続開始
-    conn2.start(client_config, "127.0.0.1", port)
 
-    # 重要: CONNECTED を待たずに即座にストリームを開いてデータを送信
-    # これが 0-RTT の本質
-    stream = conn2.open_stream(msquic.StreamOpenFlags.NONE)
-    stream.start(msquic.StreamStartFlags.IMMEDIATE)
+@pytest.mark.parametrize("scenario", ["ticket_only", "resume", "early_data"])
+def test_zero_rtt(request, zero_rtt_server, zero_rtt_client, scenario):
+    """0-RTT Resumption のテスト
 
+    - ticket_only: Ticket を使わずに接続し、サーバーが send_resumption_ticket() を
+      呼んだ後にクライアントが RESUMPTION_TICKET_RECEIVED イベントを受信することを確認する
+    - resume: ticket_only で確認した接続で取得した Ticket を使用して
+      セッションを再開する。0-RTT データ送信は行わない
+    - early_data: 真の 0-RTT テスト。CONNECTED イベントを待たずにデータを送信し、
+      サーバーがそのデータを受信できることを確認する
+    """
+    if scenario == "ticket_only":
+        # Ticket を使わない接続は resume と共有するフルハンドシェイクで確認する
+        full_handshake_peer = request.getfixturevalue("full_handshake_peer")
+        assert full_handshake_peer.ticket_count == 1
+        assert len(full_handshake_peer.ticket.result()) > 0, "Ticket should not be empty"
+        return
+
+    if scenario == "resume":
+        resumption_ticket = request.getfixturevalue("full_handshake_peer").ticket.result()
+    else:
+        resumption_ticket = request.getfixturevalue("early_data_ticket")
+
+    index = len(zero_rtt_server["connections"])
+    peer = _ClientPeer()
+    deadline = time.monotonic() + _WAIT_DEADLINE
     early_data = b"0-RTT Early Data!"
-    stream.send(early_data, msquic.SendFlags.FIN)
-
-    # 接続完了を待機
-    assert client_connected_event2.wait(timeout=5.0), "Second client connection timeout"
-    assert server_connected_events[1].wait(timeout=5.0), "Second server connection timeout"
 
-    # サーバーがデータを受信したことを確認
-    assert server_data_received_event.wait(timeout=5.0), "Server did not receive early data"
-    assert b"".join(server_received_data) == early_data, "Early data mismatch"
-
-    # セッションが再開されたことを確認
-    assert client_session_resumed[0], "Session should be resumed for 0-RTT"
-
-    # クリーンアップ
-    conn2.shutdown(msquic.ConnectionShutdownFlags.NONE, 0)
-    assert client_shutdown_event2.wait(timeout=5.0), "Second client shutdown timeout"
-    assert server_shutdown_events[1].wait(timeout=5.0), "Second server shutdown timeout"
-
-    listener.close()
+    # with 文を抜けると接続を閉じ、SHUTDOWN_COMPLETE まで待機する
+    with msquic.Connection(zero_rtt_client["registration"]) as conn:
+        peer.register_callbacks(conn)
+
+        # Resumption Ticket を設定
+        # set_resumption_ticket はバッファプロトコルに対応したオブジェクトをコピーせずに受け付ける
+        conn.set_resumption_ticket(memoryview(resumption_ticket))
+
+        # 接続開始
+        conn.start(zero_rtt_client["configuration"], "127.0.0.1", zero_rtt_server["port"])
+
+        if scenario == "early_data":
+            # 重要: CONNECTED を待たずに即座にストリームを開いてデータを送信
+            # これが 0-RTT の本質
+            # Stream の作成、開始、送信を 1 回の呼び出しで行う
+            conn.open_and_send(early_data, msquic.StreamOpenFlags.NONE, msquic.SendFlags.FIN)
+
+        # 接続完了を待機
+        session_resumed = peer.connected.result(timeout=remaining_time(deadline))
+        server_conn = zero_rtt_server["connections"][index]
+        assert server_conn.state.wait_until(_ZeroRttEvent.SERVER_CONNECTED, deadline), (
+            "Server connection timeout"
+        )
+
+        # セッションが再開されたことを確認
+        assert session_resumed, "Connection should be resumed (client)"
+        assert server_conn.resumed, "Connection should be resumed (server)"
+
+        if scenario == "early_data":
+            # サーバーがデータを受信したことを確認
+            assert server_conn.state.wait_until(_ZeroRttEvent.SERVER_DATA_RECEIVED, deadline), (
+                "Server did not receive early data"
+            )
+            assert b"".join(server_conn.received_data) == early_data, "Early data mismatch"
+
+    # clear_zero_rtt_server_connections がサーバー側の Connection を解放する前に終了を待機する
+    assert server_conn.state.wait_until(_ZeroRttEvent.SERVER_SHUTDOWN, deadline), (
+        "Server shutdown timeout"
+    )
 
 
 def test_resumption_levels_enum():